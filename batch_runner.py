@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Convert many DocSend documents in one run.
+
+Documents are listed in a JSON manifest:
+
+    {
+      "settings": {"max_requests": 8, "ocr_workers": 8},
+      "cookies": {
+        "team": "cookies_team.json",
+        "partner": {"_v_": "...", "_dss_": "...", "_us_": "..."}
+      },
+      "defaults": {"use_ocr": true, "language": "eng"},
+      "jobs": [
+        {"url": "https://docsend.com/view/abc/d/def", "name": "Q3 Board Deck", "cookies": "team"},
+        {"url": "https://docsend.com/view/ghi/d/jkl", "name": "Partner Update", "cookies": "partner",
+         "language": "fra", "output_profile": "compact"}
+      ]
+    }
+
+A cookie set is either a dictionary of cookies or the path of a file in the
+cookies_template.json format. Every job setting (see JOB_DEFAULTS) can be set
+in "defaults" and overridden per job.
+
+Jobs go through two stages that overlap across documents: downloading, then
+building the PDF. Documents that share a cookie set share one
+DocSendImageDownloader (one session and connection pool). All downloaders draw
+from one pool of max_requests request slots and the process-wide rate limiter.
+At most ocr_jobs documents are OCR'd at once, and they split ocr_workers OCR
+processes between them (one pool, compile_to_pdf.start_ocr_pool, that lives as
+long as the runner). So the next deck downloads while the previous one is
+OCR'd, and neither stage is overloaded however long the manifest is.
+
+Usage:
+    python batch_runner.py batch_manifest.json
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from compile_to_pdf import start_ocr_pool, stop_ocr_pool, use_ocr_backend
+from docsend_image_downloader import DocSendImageDownloader
+from get_cookies_helper import extract_document_info_from_url, load_cookies_from_file
+from http_cache import HTTPCache
+from image_store import ImageStore
+from ocr_cache import OCRCache
+from pdf_engines import get_pdf_engine
+
+# Settings a job can override; the values match docsend_to_pdf.py
+JOB_DEFAULTS = {
+    'end_page': None,
+    'refresh': False,
+    'use_ocr': True,
+    'use_premium_ocr': False,
+    'language': 'eng',
+    'text_layer_pdf': True,
+    'ocr_preprocess': False,
+    'output_profile': None,
+}
+
+# Runner settings a manifest's "settings" section can change
+RUNNER_DEFAULTS = {
+    'max_requests': 8,
+    'download_jobs': 4,
+    'download_workers': 4,
+    'ocr_workers': os.cpu_count() or 2,
+    'ocr_jobs': 1,
+    'ocr_backend': 'subprocess',
+}
+
+
+def check_job_name(name):
+    """
+    Check that a job name is a plain file name
+
+    The name becomes downloaded_images/<name>/ and pdf_documents/<name>.pdf, so it
+    must not be able to point anywhere else.
+
+    Raises:
+        ValueError: If name is empty, absolute, or contains a path separator or '..'
+    """
+    separators = {'/', os.sep, os.altsep} - {None}
+    if (not isinstance(name, str) or not name.strip() or os.path.isabs(name) or '..' in name or '\0' in name
+            or any(separator in name for separator in separators)):
+        raise ValueError(f"Invalid job name {name!r}: use a plain file name without path separators or '..'")
+
+
+def load_batch_manifest(path):
+    """
+    Read a batch manifest
+
+    Returns:
+        tuple: (runner settings, cookie sets, jobs with defaults applied)
+
+    Raises:
+        ValueError: If the manifest has no jobs, or a job has no url or an invalid or
+            duplicate name
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+
+    settings = dict(RUNNER_DEFAULTS, **manifest.get('settings', {}))
+    defaults = dict(JOB_DEFAULTS, **manifest.get('defaults', {}))
+    jobs = [dict(defaults, **job) for job in manifest.get('jobs', [])]
+    if not jobs:
+        raise ValueError(f"{path} lists no jobs")
+    for n, job in enumerate(jobs, 1):
+        if not job.get('url') or not job.get('name'):
+            raise ValueError(f"Job {n} in {path} needs a url and a name")
+        try:
+            check_job_name(job['name'])
+        except ValueError as e:
+            raise ValueError(f"Job {n} in {path}: {e}") from None
+    names = [job['name'] for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"{path} uses these job names more than once: {', '.join(duplicates)}")
+    return settings, manifest.get('cookies', {}), jobs
+
+
+def new_job_report(job):
+    return {
+        'name': job['name'],
+        'url': job['url'],
+        'status': 'queued',
+        'pages': 0,
+        'missing_pages': [],
+        'image_dir': None,
+        'output_pdf': None,
+        'download_seconds': None,
+        'pdf_seconds': None,
+        'error': None,
+    }
+
+
+class BatchRunner:
+    """Schedule documents through shared downloaders and a capped OCR stage"""
+
+    def __init__(self, cookie_sets=None, max_requests=8, download_jobs=4, download_workers=4,
+                 ocr_workers=None, ocr_jobs=1, ocr_backend='subprocess', http_cache=None,
+                 image_store=None, ocr_cache=None, allow_cookie_files=True, shared_ocr_pool=True):
+        """
+        Args:
+            cookie_sets (dict): Name -> cookie dictionary or cookie file path
+            max_requests (int): Requests in flight at once across all documents
+            download_jobs (int): Documents downloading at once
+            download_workers (int): Pages fetched concurrently within one document
+            ocr_workers (int): OCR processes across all documents (default: one per CPU core)
+            ocr_jobs (int): Documents whose PDF is built at once; they split ocr_workers
+            ocr_backend (str): OCR backend for every job ('subprocess' or 'tesserocr')
+            http_cache (HTTPCache): Shared HTTP cache (default: .http_cache)
+            image_store (ImageStore): Shared image store (default: image_store/)
+            ocr_cache (OCRCache): Shared OCR cache (default: .ocr_cache)
+            allow_cookie_files (bool): Let a job name a cookie file directly; when False a
+                job can only use a cookie set from cookie_sets or a cookie dictionary
+            shared_ocr_pool (bool): Run all OCR on one process pool of ocr_workers, started
+                here rather than by the worker thread of the first job that needs it
+        """
+        self.cookie_sets = cookie_sets or {}
+        self.max_requests = max(1, max_requests)
+        self.download_workers = max(1, download_workers)
+        self.ocr_workers = max(1, ocr_workers or os.cpu_count() or 1)
+        self.ocr_jobs = max(1, ocr_jobs)
+        self.http_cache = http_cache or HTTPCache()
+        self.image_store = image_store or ImageStore()
+        self.ocr_cache = ocr_cache or OCRCache()
+        self.allow_cookie_files = allow_cookie_files
+        self.request_slots = threading.BoundedSemaphore(self.max_requests)
+        self._downloaders = {}
+        self._downloaders_lock = threading.Lock()
+        self._downloads = ThreadPoolExecutor(max_workers=max(1, download_jobs), thread_name_prefix='download')
+        self._pdfs = ThreadPoolExecutor(max_workers=self.ocr_jobs, thread_name_prefix='pdf')
+        self._active_names = set()  # Names of jobs queued or running - they share output paths
+        self._active_lock = threading.Lock()
+        use_ocr_backend(ocr_backend)
+        self.shared_ocr_pool = shared_ocr_pool
+        if shared_ocr_pool:
+            start_ocr_pool(self.ocr_workers)
+
+    def _cookies(self, reference):
+        if isinstance(reference, dict):
+            return reference
+        if reference not in self.cookie_sets and not self.allow_cookie_files:
+            return None
+        cookie_set = self.cookie_sets.get(reference, reference)
+        if isinstance(cookie_set, dict):
+            return cookie_set
+        return load_cookies_from_file(cookie_set) if cookie_set else None
+
+    def downloader_for(self, reference):
+        """
+        The downloader for a cookie set, created on first use
+
+        Args:
+            reference: Cookie set name from the manifest, a cookie file path, or a cookie dictionary
+
+        Returns:
+            DocSendImageDownloader: Shared by every job with the same cookies, or None if
+                the cookies can't be loaded
+        """
+        key = json.dumps(reference, sort_keys=True)
+        with self._downloaders_lock:
+            downloader = self._downloaders.get(key)
+            if downloader is None:
+                cookies = self._cookies(reference)
+                if not cookies:
+                    return None
+                downloader = DocSendImageDownloader(
+                    cookies=cookies,
+                    max_workers=self.download_workers,
+                    http_cache=self.http_cache,
+                    image_store=self.image_store,
+                    pool_maxsize=self.max_requests,
+                    request_slots=self.request_slots
+                )
+                self._downloaders[key] = downloader
+            return downloader
+
+    def _download(self, job, report):
+        """Download stage; returns True if there are pages to build a PDF from"""
+        report['status'] = 'downloading'
+        started = time.time()
+        try:
+            document_id, view_id = extract_document_info_from_url(job['url'])
+            if not document_id:
+                report['error'] = "Could not parse the document URL"
+                return False
+            downloader = self.downloader_for(job.get('cookies'))
+            if downloader is None:
+                report['error'] = f"No cookies for cookie set {job.get('cookies')!r}"
+                return False
+
+            image_dir = f"downloaded_images/{job['name']}"
+            failures = {}
+            report['pages'] = downloader.download_document_images(
+                document_id=document_id,
+                view_id=view_id,
+                end_page=job['end_page'],
+                output_dir=image_dir,
+                resume=not job['refresh'],
+                failures=failures
+            )
+            report['image_dir'] = image_dir
+            report['missing_pages'] = sorted(failures)
+            if not report['pages']:
+                report['error'] = "No pages downloaded - check the URL and cookies"
+                return False
+            return True
+        except Exception as e:
+            report['error'] = f"Download failed: {e}"
+            return False
+        finally:
+            report['download_seconds'] = round(time.time() - started, 1)
+
+    def _build_pdf(self, job, report):
+        """PDF stage; OCR gets this job's share of ocr_workers"""
+        report['status'] = 'building'
+        started = time.time()
+        workers = max(1, self.ocr_workers // self.ocr_jobs)
+        image_dir = report['image_dir']
+        try:
+            if not job['use_ocr']:
+                output_pdf = f"pdf_documents/{job['name']}.pdf"
+                success = get_pdf_engine('image-only')(image_dir, output_pdf)
+            elif job['use_premium_ocr']:
+                output_pdf = f"pdf_documents/{job['name']}_premium.pdf"
+                success = get_pdf_engine('ocrmypdf')(image_dir, output_pdf, job['language'], high_quality_mode=True,
+                                                     ocr_cache=self.ocr_cache, jobs=workers)
+            else:
+                output_pdf = f"pdf_documents/{job['name']}.pdf"
+                preprocess = None
+                if job['ocr_preprocess']:
+                    from ocr_preprocess import OCRPreprocessor
+                    preprocess = OCRPreprocessor()
+                success = get_pdf_engine('tesseract')(
+                    image_dir, output_pdf, job['language'], workers=workers, ocr_cache=self.ocr_cache,
+                    text_layer=job['text_layer_pdf'], preprocess=preprocess
+                )
+            if success and job['output_profile']:
+                from output_profiles import apply_output_profile
+                apply_output_profile(output_pdf, profile=job['output_profile'], workers=workers)
+            if success:
+                report['output_pdf'] = output_pdf
+            else:
+                report['error'] = "PDF creation failed"
+            return success
+        except Exception as e:
+            report['error'] = f"PDF creation failed: {e}"
+            return False
+        finally:
+            report['pdf_seconds'] = round(time.time() - started, 1)
+
+    def name_in_use(self, name):
+        """True while a job with this name is queued or running"""
+        with self._active_lock:
+            return name in self._active_names
+
+    def submit(self, job):
+        """
+        Queue a job (a dictionary with JOB_DEFAULTS keys plus url, name and cookies)
+
+        Returns:
+            concurrent.futures.Future: Resolves to the job's report once it has finished or failed.
+                future.report is the same report, updated while the job runs.
+
+        Raises:
+            ValueError: If a job with the same name is queued or running - both would
+                write to the same image directory and PDF
+        """
+        job = dict(JOB_DEFAULTS, **job)
+        with self._active_lock:
+            if job['name'] in self._active_names:
+                raise ValueError(f"A job named {job['name']!r} is already queued or running")
+            self._active_names.add(job['name'])
+        report = new_job_report(job)
+        result = Future()
+        result.report = report
+
+        def finish(status):
+            report['status'] = status
+            with self._active_lock:
+                self._active_names.discard(job['name'])
+            result.set_result(report)
+
+        def built(future):
+            if not future.cancelled():
+                finish('ok' if future.result() else 'failed')
+
+        def downloaded(future):
+            if future.cancelled():
+                return
+            if not future.result():
+                finish('failed')
+                return
+            self._pdfs.submit(self._build_pdf, job, report).add_done_callback(built)
+
+        self._downloads.submit(self._download, job, report).add_done_callback(downloaded)
+        return result
+
+    def run(self, jobs):
+        """Run jobs to completion; returns their reports in the order given"""
+        futures = [self.submit(job) for job in jobs]
+        return [future.result() for future in futures]
+
+    def close(self, cancel_pending=False):
+        """
+        Stop the worker threads
+
+        Args:
+            cancel_pending (bool): Drop jobs that have not started a stage yet (their
+                futures never resolve) instead of running them first
+        """
+        self._downloads.shutdown(wait=True, cancel_futures=cancel_pending)
+        self._pdfs.shutdown(wait=True, cancel_futures=cancel_pending)
+        if self.shared_ocr_pool:
+            stop_ocr_pool()
+
+
+def print_batch_report(reports):
+    print("\n📋 Batch report")
+    print("=" * 50)
+    for report in reports:
+        if report['status'] == 'ok':
+            missing = f", {len(report['missing_pages'])} missing" if report['missing_pages'] else ""
+            print(f"✅ {report['name']}: {report['pages']} pages{missing} -> {report['output_pdf']} "
+                  f"(download {report['download_seconds']}s, PDF {report['pdf_seconds']}s)")
+        else:
+            print(f"❌ {report['name']}: {report['error']}")
+    succeeded = sum(report['status'] == 'ok' for report in reports)
+    print(f"\n🎉 {succeeded}/{len(reports)} documents converted")
+
+
+def main():
+    manifest_path = sys.argv[1] if len(sys.argv) > 1 else 'batch_manifest.json'
+    report_path = 'pdf_documents/batch_report.json'
+
+    print("🚀 DocSend Batch Converter")
+    print("=" * 50)
+    if not os.path.exists(manifest_path):
+        print(f"❌ Manifest {manifest_path} not found")
+        print("💡 See the docstring of batch_runner.py for the manifest format")
+        return
+
+    try:
+        settings, cookie_sets, jobs = load_batch_manifest(manifest_path)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"📄 {len(jobs)} documents, {settings['max_requests']} requests in flight, "
+          f"{settings['ocr_workers']} OCR workers")
+
+    started = time.time()
+    runner = BatchRunner(cookie_sets=cookie_sets, **settings)
+    try:
+        reports = runner.run(jobs)
+    finally:
+        runner.close()
+
+    print_batch_report(reports)
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump({'manifest': manifest_path, 'seconds': round(time.time() - started, 1), 'jobs': reports}, f,
+                  indent=2)
+    print(f"📊 Report: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
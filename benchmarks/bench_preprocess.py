@@ -0,0 +1,97 @@
+"""
+Benchmark: OCR time per page with and without OCRPreprocessor.
+
+Runs Tesseract (word boxes, as used by the text-layer writer) over the same
+pages as they are, and after preprocessing at each of several settings, and
+reports preprocessing time, OCR time and words found per page. Words found is
+a rough accuracy check - a setting that is faster but finds far fewer words is
+not a win.
+
+Usage:
+    python benchmarks/bench_preprocess.py [image_dir] [--pages 10] [--target-dpi 200 150]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from compile_to_pdf import TESSERACT_CONFIG, configure_tesseract, get_ocr_backend, load_images, open_image
+from image_pdf_writer import read_source
+from ocr_preprocess import OCRPreprocessor, rescale_tsv
+from text_layer_pdf import parse_tsv_words
+
+
+def make_pages(directory, count, size=(2480, 1395)):
+    """Write `count` synthetic colourful slides with a few lines of text each"""
+    for page in range(1, count + 1):
+        background = (40 + page * 20 % 200, 90, 160) if page % 2 else (245, 225, 180)
+        text = 'white' if page % 2 else (30, 30, 60)
+        image = Image.new('RGB', size, background)
+        draw = ImageDraw.Draw(image)
+        for line in range(10):
+            draw.text((120, 100 + line * 120), f"Slide {page}: customer retention improved across {line + 3} regions",
+                      fill=text, font_size=64)
+        image.save(os.path.join(directory, f'page_{page:03d}.jpg'), 'JPEG', quality=90)
+
+
+def run(pages, language, preprocess):
+    """OCR every page; returns (preprocess seconds, OCR seconds, words found)"""
+    backend = get_ocr_backend()
+    preprocess_seconds = ocr_seconds = 0.0
+    words = 0
+    for source in pages:
+        image = open_image(source)
+        scale = 1.0
+        if preprocess is not None:
+            started = time.perf_counter()
+            image = preprocess.process(image)
+            preprocess_seconds += time.perf_counter() - started
+            scale = preprocess.scale
+        started = time.perf_counter()
+        tsv = backend.ocr(image, language, TESSERACT_CONFIG, kind='tsv')
+        ocr_seconds += time.perf_counter() - started
+        if scale != 1.0:
+            tsv = rescale_tsv(tsv, 1.0 / scale)
+        words += len(parse_tsv_words(tsv))
+    return preprocess_seconds, ocr_seconds, words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', nargs='?', help='Directory of page_NNN.jpg files (default: synthetic pages)')
+    parser.add_argument('--pages', type=int, default=10, help='Pages to OCR')
+    parser.add_argument('--language', default='eng')
+    parser.add_argument('--target-dpi', type=int, nargs='*', default=[200, 150],
+                        help='Downscaled resolutions to try in addition to full size')
+    args = parser.parse_args()
+
+    if not configure_tesseract():
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        image_dir = args.image_dir
+        if image_dir is None:
+            image_dir = work_dir
+            make_pages(image_dir, args.pages)
+        pages = [read_source(path) for path in load_images(image_dir)[:args.pages]]
+
+    settings = [('original image', None), ('gray + contrast + binarize', OCRPreprocessor())]
+    settings += [(f'... downscaled to {dpi} DPI', OCRPreprocessor(target_dpi=dpi)) for dpi in args.target_dpi]
+
+    print(f"OCR of {len(pages)} pages with the '{get_ocr_backend().name}' backend\n")
+    print(f"{'setting':<30} {'preprocess':>11} {'OCR':>10} {'total':>10} {'words':>8}")
+    for name, preprocess in settings:
+        preprocess_seconds, ocr_seconds, words = run(pages, args.language, preprocess)
+        count = len(pages)
+        print(f"{name:<30} {1000 * preprocess_seconds / count:>8.0f} ms {1000 * ocr_seconds / count:>7.0f} ms "
+              f"{1000 * (preprocess_seconds + ocr_seconds) / count:>7.0f} ms {words / count:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
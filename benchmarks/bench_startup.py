@@ -0,0 +1,137 @@
+"""
+Benchmark: start-up time of the command-line entry points and PDF engines.
+
+Each scenario runs in a fresh Python process, several times, and reports the
+median and fastest time to import the module (or resolve the engine), minus
+the time an empty `python -c pass` takes, plus the heavy dependencies that got
+loaded along the way. A download-only or image-only run should not load
+NumPy, pytesseract, PyPDF2 or ocrmypdf; a heavy module showing up for a
+scenario that doesn't need it means an import has stopped being lazy.
+
+Results are appended to a JSONL file and compared with the last run of the
+same scenario, like bench_throughput.py.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--results benchmarks/startup_results.jsonl]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_results.jsonl')
+
+# Name -> Python statement to time
+SCENARIOS = {
+    'docsend_to_pdf': 'import docsend_to_pdf',
+    'compile_to_pdf': 'import compile_to_pdf',
+    'batch_runner': 'import batch_runner',
+    'docsend_service': 'import docsend_service',
+    'engine:image-only': "import pdf_engines; pdf_engines.get_pdf_engine('image-only')",
+    'engine:tesseract': "import pdf_engines; pdf_engines.get_pdf_engine('tesseract')",
+}
+
+# Modules worth reporting when a scenario loads them
+HEAVY_MODULES = ('requests', 'PIL.Image', 'numpy', 'reportlab.pdfgen.canvas', 'pytesseract', 'PyPDF2',
+                 'ocrmypdf', 'pikepdf', 'tesserocr', 'multiprocessing')
+
+PROBE = '''
+import sys, time
+started = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - started
+print(repr((seconds, [m for m in {heavy!r} if m in sys.modules])))
+'''
+
+
+def time_statement(statement, runs):
+    """
+    Run a statement in `runs` fresh interpreters
+
+    Returns:
+        tuple: (process wall times in seconds, in-process statement times, heavy modules loaded)
+    """
+    wall, inside, loaded = [], [], []
+    code = PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout
+        wall.append(time.perf_counter() - started)
+        seconds, loaded = eval(output.strip().splitlines()[-1])
+        inside.append(seconds)
+    return wall, inside, loaded
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(record, history, tolerance):
+    """Describe how a result differs from the last run of the same scenario"""
+    previous = [r for r in history if r['scenario'] == record['scenario']]
+    if not previous or not previous[-1]['import_ms']:
+        return ""
+    last = previous[-1]
+    change = record['import_ms'] / last['import_ms'] - 1
+    flag = "⚠️  slower" if change > tolerance else ""
+    return f"  ({change:+.0%} vs {last['commit'] or 'last run'}) {flag}".rstrip()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=ROOT).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='*', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per scenario')
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help='JSONL file results are appended to')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Slowdown flagged as a regression')
+    args = parser.parse_args()
+
+    history = load_results(args.results)
+    commit = git_commit()
+    baseline, _, _ = time_statement('pass', args.runs)
+    baseline_ms = 1000 * statistics.median(baseline)
+    print(f"🐍 Empty interpreter: {baseline_ms:.0f} ms (median of {args.runs})\n")
+    print(f"{'scenario':<20} {'import':>9} {'fastest':>9} {'process':>9}  heavy modules loaded")
+
+    for scenario in args.scenarios:
+        wall, inside, loaded = time_statement(SCENARIOS[scenario], args.runs)
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'scenario': scenario,
+            'runs': args.runs,
+            'import_ms': round(1000 * statistics.median(inside), 1),
+            'fastest_ms': round(1000 * min(inside), 1),
+            'process_ms': round(1000 * statistics.median(wall), 1),
+            'baseline_ms': round(baseline_ms, 1),
+            'heavy_modules': loaded,
+        }
+        print(f"{scenario:<20} {record['import_ms']:>6.0f} ms {record['fastest_ms']:>6.0f} ms "
+              f"{record['process_ms']:>6.0f} ms  {', '.join(loaded) or '-'}"
+              f"{compare(record, history, args.tolerance)}")
+
+        with open(args.results, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    print(f"\n📊 Results appended to {args.results}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: single-pass text-layer writer vs. per-page PyPDF2 merge.
+
+Builds the same searchable PDF twice with create_pdf_with_tesseract_default -
+once merging Tesseract's per-page PDFs with PyPDF2 (text_layer=False) and once
+drawing word boxes over the images with TextLayerPDFWriter (text_layer=True) -
+and reports wall time, peak Python memory (tracemalloc) and output size.
+
+By default Tesseract runs once up front to fill a temporary OCR cache, so the
+timed runs measure PDF assembly only; pass --include-ocr to time OCR as well.
+
+Usage:
+    python benchmarks/bench_text_layer.py [image_dir] [--pages 20] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from compile_to_pdf import create_pdf_with_tesseract_default
+from ocr_cache import OCRCache
+
+
+def make_pages(directory, count, size=(2480, 1395)):
+    """Write `count` synthetic slide images with a few lines of text each"""
+    for page in range(1, count + 1):
+        image = Image.new('RGB', size, 'white')
+        draw = ImageDraw.Draw(image)
+        for line in range(12):
+            draw.text((120, 100 + line * 100), f"Slide {page} line {line}: quarterly revenue grew 42%",
+                      fill='black', font_size=60)
+        image.save(os.path.join(directory, f'page_{page:03d}.jpg'), 'JPEG', quality=90)
+
+
+def run(image_dir, output_pdf, language, text_layer, ocr_cache):
+    tracemalloc.start()
+    started = time.perf_counter()
+    ok = create_pdf_with_tesseract_default(image_dir, output_pdf, language, workers=1,
+                                           ocr_cache=ocr_cache, text_layer=text_layer)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if not ok:
+        raise RuntimeError(f"PDF creation failed (text_layer={text_layer})")
+    return elapsed, peak, os.path.getsize(output_pdf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('image_dir', nargs='?', help='Directory of page_NNN.jpg files (default: synthetic pages)')
+    parser.add_argument('--pages', type=int, default=20, help='Synthetic pages to generate')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per writer (best is reported)')
+    parser.add_argument('--language', default='eng')
+    parser.add_argument('--include-ocr', action='store_true', help='Run Tesseract in every timed run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        image_dir = args.image_dir
+        if image_dir is None:
+            image_dir = os.path.join(work_dir, 'images')
+            os.makedirs(image_dir)
+            make_pages(image_dir, args.pages)
+
+        ocr_cache = None
+        if not args.include_ocr:
+            ocr_cache = OCRCache(os.path.join(work_dir, 'ocr_cache'))
+            print("Warming the OCR cache...")
+            for text_layer in (False, True):
+                run(image_dir, os.path.join(work_dir, 'warmup.pdf'), args.language, text_layer, ocr_cache)
+
+        results = {}
+        for text_layer in (False, True):
+            name = 'single-pass text layer' if text_layer else 'PyPDF2 per-page merge'
+            output_pdf = os.path.join(work_dir, f'{"text_layer" if text_layer else "pypdf2"}.pdf')
+            runs = [run(image_dir, output_pdf, args.language, text_layer, ocr_cache) for _ in range(args.repeat)]
+            results[name] = (min(r[0] for r in runs), max(r[1] for r in runs), runs[-1][2])
+
+    print(f"\n{'writer':<24} {'best time':>10} {'peak memory':>12} {'output size':>12}")
+    for name, (elapsed, peak, size) in results.items():
+        print(f"{name:<24} {elapsed:>9.2f}s {peak / 1e6:>10.1f}MB {size / 1e6:>10.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
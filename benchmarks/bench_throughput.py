@@ -0,0 +1,280 @@
+"""
+Benchmark: download and PDF throughput against a local mock DocSend.
+
+Starts MockDocSendServer (see mock_docsend.py) with the chosen latency and
+failure rates, then runs each scenario in a fresh process so peak memory is
+its own:
+
+    download     DocSendImageDownloader.download_document_images from the mock
+    image-only   create_pdf_without_ocr
+    tesseract    create_pdf_with_tesseract_default (text-layer writer)
+    pipelined    create_pdf_pipelined, downloading from the mock while it OCRs
+    ocrmypdf     create_pdf_with_ocrmypdf
+
+For each scenario it reports pages/sec, p50/p99 latency and peak RSS. Latency
+is per request for scenarios that download (including retries and rate-limiter
+waits), and per page for the others (time between the engine taking
+successive pages, which is close to zero for engines that read ahead). OCR
+runs without a cache, so it is timed every run.
+
+Results are appended to a JSONL file and compared with the last run of the
+same scenario and settings, so a slowdown shows up as soon as it is measured.
+
+Usage:
+    python benchmarks/bench_throughput.py [--pages 30] [--latency 0.05] [--error-rate 0.02]
+        [--throttle-rate 0.02] [--scenarios download image-only] [--results benchmarks/results.jsonl]
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from mock_docsend import MockDocSendServer
+
+SCENARIOS = ('download', 'image-only', 'tesseract', 'pipelined', 'ocrmypdf')
+OCR_SCENARIOS = ('tesseract', 'pipelined', 'ocrmypdf')
+DOCUMENT_ID, VIEW_ID = 'mockdoc', 'mockview'
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None if it is empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and its finished children, in MB (None on Windows)"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def make_downloader(base_url, settings):
+    """A downloader pointed at the mock, with request latencies recorded in downloader.latencies"""
+    from docsend_image_downloader import DocSendImageDownloader
+
+    downloader = DocSendImageDownloader(max_workers=settings['workers'])
+    downloader.base_url = base_url
+    downloader.latencies = []
+    get = downloader._get
+
+    def timed_get(url, **kwargs):
+        started = time.perf_counter()
+        try:
+            return get(url, **kwargs)
+        finally:
+            downloader.latencies.append(time.perf_counter() - started)
+
+    downloader._get = timed_get
+    return downloader
+
+
+def timed_pages(sources, stamps):
+    """Yield sources, recording when the engine asks for each one"""
+    for source in sources:
+        stamps.append(time.perf_counter())
+        yield source
+
+
+def run_scenario(scenario, base_url, image_dir, settings):
+    """
+    Run one scenario in the current process
+
+    Returns:
+        dict: pages, seconds and latencies (seconds), or {'skipped': reason}
+    """
+    import compile_to_pdf
+
+    if scenario in OCR_SCENARIOS and not compile_to_pdf.configure_tesseract():
+        return {'skipped': 'Tesseract not found'}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_pdf = os.path.join(work_dir, 'output.pdf')
+        sources = compile_to_pdf.load_images(image_dir)
+        stamps = []
+        downloader = None
+        started = time.perf_counter()
+
+        if scenario == 'download':
+            downloader = make_downloader(base_url, settings)
+            pages = downloader.download_document_images(DOCUMENT_ID, VIEW_ID, output_dir=work_dir, resume=False)
+            ok = pages > 0
+        elif scenario == 'pipelined':
+            downloader = make_downloader(base_url, settings)
+            images = downloader.iter_page_images(DOCUMENT_ID, VIEW_ID)
+            ok = compile_to_pdf.create_pdf_pipelined(None, output_pdf, images=images,
+                                                     ocr_workers=settings['ocr_workers'], text_layer=True)
+            pages = settings['pages'] - len(downloader.failed_pages)
+        else:
+            images = timed_pages(sources, stamps)
+            if scenario == 'image-only':
+                ok = compile_to_pdf.create_pdf_without_ocr(None, output_pdf, images=images)
+            elif scenario == 'tesseract':
+                ok = compile_to_pdf.create_pdf_with_tesseract_default(None, output_pdf, images=images,
+                                                                      workers=settings['ocr_workers'],
+                                                                      text_layer=True)
+            else:
+                ok = compile_to_pdf.create_pdf_with_ocrmypdf(None, output_pdf, images=images,
+                                                             jobs=settings['ocr_workers'])
+            pages = len(sources)
+
+        seconds = time.perf_counter() - started
+
+    if not ok:
+        return {'skipped': 'scenario failed'}
+    if downloader is not None:
+        latencies = downloader.latencies
+    else:
+        stamps.append(started + seconds)
+        latencies = [b - a for a, b in zip(stamps, stamps[1:])]
+    return {'pages': pages, 'seconds': seconds, 'latencies': latencies}
+
+
+def _scenario_process(scenario, base_url, image_dir, settings, results, verbose):
+    with open(os.devnull, 'w') as devnull, contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        result = run_scenario(scenario, base_url, image_dir, settings)
+    result['peak_rss_mb'] = peak_rss_mb()
+    results.put(result)
+
+
+def run_in_subprocess(scenario, base_url, image_dir, settings, verbose=False):
+    """Run a scenario in a fresh process, so its peak RSS is not inflated by earlier ones"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_scenario_process,
+                              args=(scenario, base_url, image_dir, settings, results, verbose))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                result = {'skipped': f'process exited with code {process.exitcode}'}
+                break
+    process.join()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(record, history, tolerance):
+    """Describe how a result differs from the last run of the same scenario and settings"""
+    previous = [r for r in history if r['scenario'] == record['scenario'] and r['settings'] == record['settings']]
+    if not previous or not record['pages_per_sec'] or not previous[-1]['pages_per_sec']:
+        return ""  # No earlier run, or a run too short to time
+    last = previous[-1]
+    change = record['pages_per_sec'] / last['pages_per_sec'] - 1
+    flag = "⚠️  slower" if change < -tolerance else ""
+    return f"  ({change:+.0%} vs {last['commit'] or 'last run'}) {flag}".rstrip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='*', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--pages', type=int, default=30, help='Pages in the mock document')
+    parser.add_argument('--workers', type=int, default=4, help='Downloader max_workers')
+    parser.add_argument('--ocr-workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every mock response')
+    parser.add_argument('--jitter', type=float, default=0.05, help='Extra random seconds per mock response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of mock requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of mock requests answered with 429')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds sent with a 429')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help='JSONL file results are appended to')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Slowdown flagged as a regression')
+    parser.add_argument('--verbose', action='store_true', help="Show the scenarios' own progress output")
+    args = parser.parse_args()
+
+    settings = {name: getattr(args, name) for name in
+                ('pages', 'workers', 'ocr_workers', 'latency', 'jitter', 'error_rate', 'throttle_rate',
+                 'retry_after', 'seed')}
+    history = load_results(args.results)
+    commit = git_commit()
+
+    server = MockDocSendServer(pages=args.pages, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                               retry_after=args.retry_after, seed=args.seed)
+    with server, tempfile.TemporaryDirectory() as image_dir:
+        # Engines that read from disk get the same slides the mock serves
+        for page in range(1, args.pages + 1):
+            with open(os.path.join(image_dir, f'page_{page:03d}.jpg'), 'wb') as f:
+                f.write(server.image_bytes(page))
+
+        print(f"🧪 Mock DocSend at {server.base_url}: {args.pages} pages, {args.latency * 1000:.0f}"
+              f"+{args.jitter * 1000:.0f} ms latency, {args.error_rate:.0%} errors, "
+              f"{args.throttle_rate:.0%} throttled\n")
+        print(f"{'scenario':<12} {'pages/s':>8} {'p50':>9} {'p99':>9} {'peak RSS':>10} {'requests':>9}")
+
+        for scenario in args.scenarios:
+            server.reset_stats()
+            result = run_in_subprocess(scenario, server.base_url, image_dir, settings, args.verbose)
+            if 'skipped' in result:
+                print(f"{scenario:<12} skipped: {result['skipped']}")
+                continue
+
+            latencies = result['latencies']
+            record = {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': commit,
+                'scenario': scenario,
+                'settings': settings,
+                'pages': result['pages'],
+                'seconds': round(result['seconds'], 3),
+                'pages_per_sec': round(result['pages'] / result['seconds'], 3) if result['seconds'] else None,
+                'p50_ms': round(1000 * percentile(latencies, 0.5), 1) if latencies else None,
+                'p99_ms': round(1000 * percentile(latencies, 0.99), 1) if latencies else None,
+                'peak_rss_mb': round(result['peak_rss_mb'], 1) if result['peak_rss_mb'] else None,
+                'server': server.stats(),
+            }
+            rate = f"{record['pages_per_sec']:.2f}" if record['pages_per_sec'] else 'n/a'
+            rss = f"{record['peak_rss_mb']:.0f} MB" if record['peak_rss_mb'] else 'n/a'
+            p50 = f"{record['p50_ms']:.0f} ms" if latencies else 'n/a'
+            p99 = f"{record['p99_ms']:.0f} ms" if latencies else 'n/a'
+            print(f"{scenario:<12} {rate:>8} {p50:>9} {p99:>9} {rss:>10} "
+                  f"{record['server'].get('requests', 0):>9}{compare(record, history, args.tolerance)}")
+
+            with open(args.results, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    print(f"\n📊 Results appended to {args.results}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Local stand-in for DocSend, for benchmarks that must not touch the real service.
+
+Serves the endpoints DocSendImageDownloader uses:
+
+    /view/{document_id}/d/{view_id}                   view page (with data-page-count)
+    /view/{document_id}/d/{view_id}/page_data/{n}     JSON with imageUrl, 404 past the last page
+    /images/{document_id}/{n}.jpg                     synthetic slide image
+
+Every response can be delayed (latency plus random jitter), and a share of
+requests can be answered with a 500 or a 429 with Retry-After, to see how the
+downloader's retries and rate limiter behave. Images carry an ETag and answer
+If-None-Match with 304, like a CDN would.
+
+Run it on its own to point a downloader at it by hand:
+
+    python benchmarks/mock_docsend.py --pages 40 --port 8765
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageDraw
+
+PAGE_DATA_PATH = re.compile(r'^/view/([^/]+)/d/([^/]+)/page_data/(\d+)$')
+VIEW_PATH = re.compile(r'^/view/([^/]+)/d/([^/]+)$')
+IMAGE_PATH = re.compile(r'^/images/([^/]+)/(\d+)\.jpg$')
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients drop connections on retries; that is expected here
+
+
+def make_slide(page, size=(2480, 1395), quality=90):
+    """JPEG bytes of a synthetic slide: a coloured background and a few lines of text"""
+    background = (40 + page * 20 % 200, 90, 160) if page % 2 else (245, 245, 240)
+    text = 'white' if page % 2 else (30, 30, 60)
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+    for line in range(10):
+        draw.text((size[0] // 20, size[1] // 14 * (line + 1)),
+                  f"Slide {page}: operating income up {line + 7}% on the prior quarter",
+                  fill=text, font_size=size[1] // 22)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality)
+    return output.getvalue()
+
+
+class MockDocSendServer:
+    """Threaded HTTP server that imitates DocSend's page_data and image endpoints"""
+
+    def __init__(self, pages=20, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, image_size=(2480, 1395), host='127.0.0.1', port=0, seed=None):
+        """
+        Args:
+            pages (int): Pages in every document served
+            latency (float): Seconds added to every response
+            jitter (float): Up to this many extra seconds, chosen at random per response
+            error_rate (float): Share of requests answered with 500
+            throttle_rate (float): Share of requests answered with 429
+            retry_after (float): Retry-After seconds sent with a 429
+            image_size (tuple): Pixel size of the slide images
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 = any free port)
+            seed (int): Seed for latency and failure injection, for repeatable runs
+        """
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.image_size = tuple(image_size)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._images = {}
+        self._stats = {}
+        self._httpd = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """URL to assign to DocSendImageDownloader.base_url"""
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def image_bytes(self, page):
+        """The slide served for a page (generated once, then reused)"""
+        with self._lock:
+            data = self._images.get(page)
+        if data is None:
+            data = make_slide(page, self.image_size)
+            with self._lock:
+                self._images.setdefault(page, data)
+        return data
+
+    def stats(self):
+        """Requests served since the last reset, e.g. {'requests': 85, 'status_429': 2}"""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+    def _count(self, status):
+        with self._lock:
+            self._stats['requests'] = self._stats.get('requests', 0) + 1
+            key = f'status_{status}'
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def _delay_and_fault(self):
+        """Sleep for this response's latency; return 500/429 if a fault is injected, else None"""
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            roll = self._random.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            return 500
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, so connection reuse is measured too
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b'', content_type='application/json', headers=None):
+                server._count(status)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body and self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                fault = server._delay_and_fault()
+                if fault == 429:
+                    self._send(429, b'{"error": "rate limited"}', headers={'Retry-After': str(server.retry_after)})
+                    return
+                if fault:
+                    self._send(fault, b'{"error": "internal error"}')
+                    return
+
+                match = PAGE_DATA_PATH.match(path)
+                if match:
+                    document_id, _, page = match.group(1), match.group(2), int(match.group(3))
+                    if not 1 <= page <= server.pages:
+                        self._send(404, b'{"error": "not found"}')
+                        return
+                    page_data = {'imageUrl': f'{server.base_url}/images/{document_id}/{page}.jpg',
+                                 'pageCount': server.pages}
+                    self._send(200, json.dumps(page_data).encode('utf-8'))
+                    return
+
+                match = IMAGE_PATH.match(path)
+                if match and 1 <= int(match.group(2)) <= server.pages:
+                    data = server.image_bytes(int(match.group(2)))
+                    etag = f'"{hashlib.sha1(data).hexdigest()}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self._send(304, headers={'ETag': etag})
+                    else:
+                        self._send(200, data, 'image/jpeg', {'ETag': etag})
+                    return
+
+                if VIEW_PATH.match(path):
+                    html = f'<html><body><div class="viewer" data-page-count="{server.pages}"></div></body></html>'
+                    self._send(200, html.encode('utf-8'), 'text/html')
+                    return
+
+                self._send(404, b'{"error": "not found"}')
+
+            do_HEAD = do_GET
+
+        return Handler
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.05, help='Extra random seconds per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with 429')
+    args = parser.parse_args()
+
+    server = MockDocSendServer(pages=args.pages, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, throttle_rate=args.throttle_rate, port=args.port)
+    print(f"🧪 Mock DocSend serving {args.pages} pages at {server.base_url}/view/mockdoc/d/mockview")
+    print("   Set downloader.base_url to the address above. Ctrl+C to stop.")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
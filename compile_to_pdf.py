@@ -1,74 +1,760 @@
+import importlib.util
+import io
 import os
-from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import landscape
-from reportlab.lib.units import inch, mm
-import glob
-import subprocess
+import queue
+import re
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
 import shutil
 from pathlib import Path
 from datetime import datetime
+from download_manifest import get_image_files
+from ocr_cache import OCRCache, image_hash
+from metrics import Metrics, get_metrics, set_metrics
 
-def create_pdf_without_ocr(image_dir, output_pdf):
+# PIL, reportlab, NumPy, multiprocessing and the OCR packages are imported
+# inside the functions that use them, so importing this module (e.g. for a
+# download-only or image-only run) doesn't load every engine's dependencies.
+
+TESSERACT_CONFIG = '--psm 1 --oem 3'  # Optimized OCR settings
+PAGE_FILE_PATTERN = re.compile(r'page_(\d+)\.')
+
+def _warn_missing_pages(previous, page):
+    """Print which page numbers are missing between two consecutive pages"""
+    if previous is not None and page > previous + 1:
+        missing = ', '.join(str(p) for p in range(previous + 1, page))
+        print(f"⚠️  Missing page(s) {missing} - the PDF goes straight from page {previous} to page {page}")
+
+def _numbered_sources(images):
+    """Strip page numbers from (page_number, source) items, warning about gaps"""
+    previous = None
+    for item in images:
+        if isinstance(item, tuple):
+            page, item = item
+            _warn_missing_pages(previous, page)
+            previous = page
+        yield item
+
+def load_images(image_dir, images=None):
     """
-    Create a PDF from all JPG images in the specified directory (no OCR).
-    Fast and simple for cases where OCR is not needed.
+    Return the page images to compile, in page order
+    
+    PDF pages are numbered consecutively, so a page that failed to download
+    shifts the ones after it; the missing page numbers are printed.
+    
+    Args:
+        image_dir (str): Directory of downloaded page_NNN.jpg files
+        images (iterable): In-memory pages instead of image_dir - image bytes, file
+            paths, or (page_number, bytes) tuples as yielded by
+            DocSendImageDownloader.iter_page_images
+            
+    Returns:
+        A list of file paths for image_dir, otherwise a lazy iterator of sources
+    """
+    if images is not None:
+        return _numbered_sources(images)
+    image_files = get_image_files(image_dir)
+    previous = None
+    for path in image_files:
+        match = PAGE_FILE_PATTERN.match(os.path.basename(path))
+        if match:
+            _warn_missing_pages(previous, int(match.group(1)))
+            previous = int(match.group(1))
+    return image_files
+
+def open_image(source):
+    """Open a page image given as a file path, as bytes or as an already opened PIL image"""
+    from PIL import Image
+    
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
+
+def _progress(i, sources):
+    return f"{i}/{len(sources)}" if isinstance(sources, list) else str(i)
+
+# Where Tesseract is usually installed on Windows, if it is not on the PATH
+WINDOWS_TESSERACT_PATHS = [
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    r'C:\Users\Public\Tesseract-OCR\tesseract.exe'
+]
+
+_tesseract_cmd = None
+
+def find_tesseract():
     """
-    # Get all jpg files in the directory
-    image_files = glob.glob(os.path.join(image_dir, 'page_*.jpg'))
+    Locate the Tesseract executable once per process
     
-    # Sort files by page number
-    image_files.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
+    Checks the TESSERACT_CMD environment variable, then the PATH, then the usual
+    Windows install locations. Only a successful lookup is remembered, so
+    Tesseract installed (or TESSERACT_CMD set) later in a long-running process
+    is still found.
     
-    if not image_files:
-        print(f"No JPG images found in {image_dir}")
+    Returns:
+        str: Path of the executable, or None if it was not found
+    """
+    global _tesseract_cmd
+    if _tesseract_cmd is None:
+        candidates = [os.environ.get('TESSERACT_CMD'), shutil.which('tesseract')] + WINDOWS_TESSERACT_PATHS
+        _tesseract_cmd = next((path for path in candidates if path and os.path.exists(path)), None)
+        if _tesseract_cmd:
+            print(f"Found Tesseract at: {_tesseract_cmd}")
+    return _tesseract_cmd
+
+def configure_tesseract():
+    """
+    Make sure the selected OCR backend can run
+    
+    For the subprocess backend this points pytesseract at the Tesseract
+    executable; the persistent tesserocr backend links libtesseract directly.
+    
+    Returns:
+        bool: True if OCR is available
+    """
+    if not get_ocr_backend().needs_executable:
+        return True
+    
+    try:
+        pytesseract = _pytesseract()
+    except ImportError:
+        print("❌ pytesseract not installed - install with: pip install pytesseract")
         return False
     
-    # Create PDF using reportlab (faster without OCR)
-    from reportlab.pdfgen import canvas
+    tesseract_cmd = find_tesseract()
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        return True
+    
+    print("❌ Tesseract not found! Please install Tesseract OCR")
+    print("Download from: https://github.com/UB-Mannheim/tesseract/wiki")
+    print("Or set TESSERACT_CMD to the path of the tesseract executable")
+    return False
+
+def _pytesseract():
+    """pytesseract, imported on first use - only the subprocess backend needs it"""
+    import pytesseract
+    return pytesseract
+
+def ocr_page_to_pdf(source, language='eng', config=TESSERACT_CONFIG):
+    """Run Tesseract on one page image and return a single-page PDF with a text layer"""
+    return _pytesseract().image_to_pdf_or_hocr(
+        open_image(source),
+        extension='pdf',
+        lang=language,
+        config=config
+    )
+
+def ocr_page_to_tsv(source, language='eng', config=TESSERACT_CONFIG):
+    """Run Tesseract on one page image and return its word boxes as TSV bytes"""
+    return _pytesseract().image_to_data(
+        open_image(source),
+        lang=language,
+        config=config
+    ).encode('utf-8')
+
+class SubprocessOCRBackend:
+    """
+    Run a tesseract process per page through pytesseract.
+    
+    Result kinds: 'pdf' is a finished single-page PDF, 'tsv' the word boxes for
+    TextLayerPDFWriter.
+    """
+    name = 'subprocess'
+    needs_executable = True
     
-    # Create output directory if it doesn't exist
-    os.makedirs(os.path.dirname(output_pdf), exist_ok=True)
+    def ocr(self, source, language='eng', config=TESSERACT_CONFIG, kind='pdf'):
+        if kind == 'pdf':
+            return ocr_page_to_pdf(source, language, config)
+        return ocr_page_to_tsv(source, language, config)
     
-    # Create canvas for the first image to determine page size
-    first_img = Image.open(image_files[0])
-    img_width, img_height = first_img.size
+    def close(self):
+        """Nothing is kept between pages"""
+
+class TesserocrBackend:
+    """
+    Keep Tesseract loaded in-process through tesserocr (pip install tesserocr).
     
-    # Calculate page size (assuming 300 DPI)
-    page_width = img_width * 72.0 / 300
-    page_height = img_height * 72.0 / 300
+    One engine is kept per thread for each language and config, so the language
+    model is loaded once per worker instead of once per page, and no temporary
+    files or processes are involved. 'pdf' results are built from the word
+    boxes with TextLayerPDFWriter. close() ends every engine.
+    """
+    name = 'tesserocr'
+    needs_executable = False
+    TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n'
     
-    c = canvas.Canvas(output_pdf, pagesize=(page_width, page_height))
+    def __init__(self):
+        if importlib.util.find_spec('tesserocr') is None:  # Fail early, in the parent
+            raise ImportError("No module named 'tesserocr'")
+        self._local = threading.local()
+        self._engines = []  # Every engine started, for close()
+        self._lock = threading.Lock()
     
-    # Process each image
-    for i, image_file in enumerate(image_files, 1):
-        print(f"Processing page {i}/{len(image_files)}...")
-        
-        if i > 1:
-            c.showPage()  # Start new page
+    @staticmethod
+    def _parse_config(config):
+        """Split a tesseract command-line config string into (psm, oem, variables)"""
+        psm = oem = None
+        variables = {}
+        args = config.split()
+        for flag, value in zip(args, args[1:]):
+            if flag == '--psm':
+                psm = int(value)
+            elif flag == '--oem':
+                oem = int(value)
+            elif flag == '-c' and '=' in value:
+                name, _, setting = value.partition('=')
+                variables[name] = setting
+        return psm, oem, variables
+    
+    def _engine(self, language, config):
+        import tesserocr
+        engines = getattr(self._local, 'engines', None)
+        if engines is None:
+            engines = self._local.engines = {}
+        engine = engines.get((language, config))
+        if engine is None:
+            psm, oem, variables = self._parse_config(config)
+            options = {'lang': language}
+            if psm is not None:
+                options['psm'] = tesserocr.PSM(psm)
+            if oem is not None:
+                options['oem'] = tesserocr.OEM(oem)
+            engine = tesserocr.PyTessBaseAPI(**options)
+            for name, setting in variables.items():
+                engine.SetVariable(name, setting)
+            engines[(language, config)] = engine
+            with self._lock:
+                self._engines.append(engine)
+        return engine
+    
+    def close(self):
+        """End every engine, freeing its language models; the next page starts a new one"""
+        with self._lock:
+            engines, self._engines = self._engines, []
+            self._local = threading.local()
+        for engine in engines:
+            engine.End()
+    
+    def ocr(self, source, language='eng', config=TESSERACT_CONFIG, kind='pdf'):
+        engine = self._engine(language, config)
+        with open_image(source) as image:
+            engine.SetImage(image)
+            engine.Recognize()
+            tsv = (self.TSV_HEADER + engine.GetTSVText(0)).encode('utf-8')
+        if kind == 'tsv':
+            return tsv
+        return page_pdf_from_tsv(source, tsv)
+
+OCR_BACKENDS = {
+    'subprocess': SubprocessOCRBackend,
+    'tesserocr': TesserocrBackend,
+}
+
+_ocr_backend = None
+
+def use_ocr_backend(name='subprocess'):
+    """
+    Select the OCR backend used by all Tesseract engines in this process
+    
+    The backend it replaces is closed (ending any tesserocr engines), so don't
+    switch backends while pages are being OCR'd.
+    
+    Args:
+        name (str): 'subprocess' (pytesseract, one tesseract process per page) or
+            'tesserocr' (persistent in-process engine per worker)
             
-        # Draw image to fill the page with high quality
-        c.drawImage(image_file, 0, 0, width=page_width, height=page_height, 
-                   preserveAspectRatio=True, mask='auto')
+    Returns:
+        The backend in use (falls back to 'subprocess' if tesserocr is missing)
+    """
+    global _ocr_backend
+    previous = _ocr_backend
+    try:
+        _ocr_backend = OCR_BACKENDS[name]()
+    except ImportError:
+        print(f"⚠️  OCR backend '{name}' is not installed (pip install {name}), using tesseract subprocesses")
+        _ocr_backend = SubprocessOCRBackend()
+    if previous is not None:
+        previous.close()
+    return _ocr_backend
+
+def _close_ocr_backend():
+    if _ocr_backend is not None:
+        _ocr_backend.close()
+
+def get_ocr_backend():
+    """The OCR backend selected with use_ocr_backend (subprocess by default)"""
+    return _ocr_backend or use_ocr_backend()
+
+def limit_tesseract_threads():
+    """Stop each tesseract process from spawning one OpenMP thread per core"""
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+def _init_ocr_worker(tesseract_cmd, backend_name):
+    from multiprocessing.util import Finalize
+    # OCR time is reported to the parent with each result; a forked copy of its
+    # metrics must not write to the same files
+    set_metrics(None)
+    limit_tesseract_threads()
+    use_ocr_backend(backend_name)
+    if get_ocr_backend().needs_executable:
+        _pytesseract().pytesseract.tesseract_cmd = tesseract_cmd
+    # Pool workers exit without running atexit handlers, but do run finalizers:
+    # end the worker's tesserocr engines when the pool shuts down
+    Finalize(None, _close_ocr_backend, exitpriority=10)
+
+_ocr_pool = None  # Long-lived OCR process pool from start_ocr_pool, shared by all OCR runs
+
+def _ocr_pool_context(shared=False):
+    """
+    multiprocessing context for an OCR process pool (None for the platform default)
+    
+    A forked child gets a copy of every lock other threads held at that moment
+    (logging, urllib3's connection pool, ...) and nothing to ever release them.
+    A fork-based pool forks when its first job is submitted, so pools created off
+    the main thread - by BatchRunner and service workers, while downloads run -
+    and the shared pool, whose first job can come from any thread, use 'spawn'.
+    """
+    import multiprocessing
+    if shared or threading.current_thread() is not threading.main_thread():
+        return multiprocessing.get_context('spawn')
+    return None
+
+def start_ocr_pool(workers=None):
+    """
+    Keep a pool of OCR worker processes running between documents
+    
+    ocr_pages uses this pool instead of starting (and importing, and with the
+    tesserocr backend loading models into) a new one per document. Its size caps
+    the OCR processes of all documents OCR'd at the same time. Call after
+    use_ocr_backend, since workers are set up for the backend selected then.
+    Workers are spawned rather than forked, since any thread may start them.
+    
+    Returns:
+        ProcessPoolExecutor: The pool
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    global _ocr_pool
+    stop_ocr_pool()
+    _ocr_pool = ProcessPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1),
+                                    mp_context=_ocr_pool_context(shared=True),
+                                    initializer=_init_ocr_worker,
+                                    initargs=(find_tesseract() or 'tesseract', get_ocr_backend().name))
+    return _ocr_pool
+
+def stop_ocr_pool():
+    """Shut down the pool started by start_ocr_pool, if any (its workers end their OCR engines)"""
+    global _ocr_pool
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown(wait=True)
+        _ocr_pool = None
+
+def _ocr_with_backend(source, language, config, kind, scale=1.0):
+    """OCR with the selected backend; word boxes from a resized image are scaled back by 1/scale"""
+    data = get_ocr_backend().ocr(source, language, config, kind)
+    if scale != 1.0:
+        from ocr_preprocess import rescale_tsv
+        data = rescale_tsv(data, 1.0 / scale)
+    return data
+
+def _ocr_page_job(source, language, config, kind='pdf', scale=1.0):
+    """Process-pool job: returns (OCR result bytes, None, seconds) or (None, error message, seconds)"""
+    started = time.perf_counter()
+    try:
+        return _ocr_with_backend(source, language, config, kind, scale), None, time.perf_counter() - started
+    except Exception as e:
+        return None, str(e), time.perf_counter() - started
+
+def _ocr_preprocessor(preprocess, kind):
+    # Tesseract's own PDFs embed the image it was given, so the OCR-only image
+    # can only be used where the PDF is drawn from word boxes
+    return preprocess if kind == 'tsv' else None
+
+def page_pdf_from_tsv(source, tsv):
+    """Single-page searchable PDF drawn from a page image and its Tesseract word boxes"""
+    from text_layer_pdf import TextLayerPDFWriter, parse_tsv_words
+    buffer = io.BytesIO()
+    writer = TextLayerPDFWriter(buffer)
+    writer.add_page(source, parse_tsv_words(tsv))
+    writer.save()
+    return buffer.getvalue()
+
+def _cached_kind(kind, cache):
+    """
+    Result kind to OCR and cache for a requested kind
+    
+    A 'pdf' result embeds the page image, which the caller already has, so with a
+    cache only the word boxes are OCR'd and stored, and the page PDF is drawn
+    from them and the image (page_pdf_from_tsv). The cache then holds a few KB
+    of text per page instead of another copy of every image.
+    """
+    return 'tsv' if cache is not None and kind == 'pdf' else kind
+
+def ocr_cache_config(config, preprocess=None):
+    """Config string that OCR results are cached under; backends' output differs, so it names the backend"""
+    cache_config = f'{config} backend={get_ocr_backend().name}'
+    return cache_config if preprocess is None else f'{cache_config} {preprocess.key}'
+
+def cached_ocr_page(source, language='eng', config=TESSERACT_CONFIG, cache=None, kind='pdf', preprocess=None,
+                    page=None):
+    """
+    OCR one page ('pdf' or 'tsv' result), reading from and filling an OCRCache when one is given
+    
+    With an OCRPreprocessor (for 'tsv' only) Tesseract reads a cleaned-up copy of the page.
+    With a cache, a 'pdf' result is drawn from cached word boxes (see _cached_kind).
+    page only labels the page's metrics spans.
+    """
+    metrics = get_metrics()
+    preprocess = _ocr_preprocessor(preprocess, kind)
+    ocr_kind = _cached_kind(kind, cache)
+    cache_config = ocr_cache_config(config, preprocess)
+    digest = image_hash(source) if cache is not None else None
+    data = cache.get(digest, language, cache_config, ocr_kind) if cache is not None else None
+    if data is not None:
+        metrics.increment('ocr_cache_hits_total', kind=ocr_kind)
+    else:
+        ocr_source = source
+        if preprocess is not None:
+            with metrics.span('preprocess', page=page):
+                ocr_source = preprocess.process(open_image(source))
+        with metrics.span('ocr', page=page):
+            data = _ocr_with_backend(ocr_source, language, config, ocr_kind,
+                                     preprocess.scale if preprocess is not None else 1.0)
+        if cache is not None:
+            cache.put(digest, language, cache_config, data, ocr_kind)
+    if ocr_kind != kind:
+        data = page_pdf_from_tsv(source, data)
+    return data
+
+def _prepare_pages(sources, language, config, cache, kind, preprocess):
+    """
+    Look pages up in the OCR cache and preprocess the rest a batch at a time
+    
+    Yields:
+        tuple: (page index, source, image hash, cached result or None, image to OCR)
+    """
+    metrics = get_metrics()
+    cache_config = ocr_cache_config(config, preprocess)
+    batch = []
+    
+    def flush():
+        uncached = [entry for entry in batch if entry[3] is None]
+        if preprocess is not None and uncached:
+            with metrics.span('preprocess'):
+                images = preprocess.process_batch([open_image(entry[1]) for entry in uncached])
+            for entry, image in zip(uncached, images):
+                entry[4] = image
+        for entry in batch:
+            yield tuple(entry)
+        batch.clear()
+    
+    for i, source in enumerate(sources, 1):
+        digest = image_hash(source) if cache is not None else None
+        cached = cache.get(digest, language, cache_config, kind) if cache is not None else None
+        if cached is not None:
+            metrics.increment('ocr_cache_hits_total', kind=kind)
+        batch.append([i, source, digest, cached, source])
+        if preprocess is None or len(batch) >= preprocess.batch_size:
+            yield from flush()
+    yield from flush()
+
+def ocr_pages(sources, language='eng', config=TESSERACT_CONFIG, workers=1, cache=None, kind='pdf',
+              preprocess=None):
+    """
+    OCR page images and yield the results in page order
+    
+    Pages are OCR'd by the backend chosen with use_ocr_backend.
+    With workers > 1, or a pool from start_ocr_pool, the pages are spread over a
+    process pool (workers then only sets how many pages are queued). Each worker runs
+    tesseract single-threaded (OMP_THREAD_LIMIT=1) so the pool does not
+    oversubscribe the CPUs, and at most 2 x workers pages are queued at a time.
+    Pages found in the OCR cache are not sent to Tesseract at all.
+    kind selects the result: 'pdf' (single-page PDF) or 'tsv' (word boxes).
+    For 'tsv', an OCRPreprocessor prepares OCR-only copies of the pages in batches.
+    With a cache, 'pdf' pages are drawn from cached word boxes (see _cached_kind).
+    
+    Yields:
+        tuple: (page index, source, result bytes or None, error message or None)
+    """
+    preprocess = _ocr_preprocessor(preprocess, kind)
+    ocr_kind = _cached_kind(kind, cache)
+    for i, source, data, error in _ocr_page_results(sources, language, config, workers, cache, ocr_kind,
+                                                    preprocess):
+        if data is not None and ocr_kind != kind:
+            try:
+                data = page_pdf_from_tsv(source, data)
+            except Exception as e:
+                data, error = None, str(e)
+        yield i, source, data, error
+
+def _ocr_page_results(sources, language, config, workers, cache, kind, preprocess):
+    """ocr_pages for the kind that is OCR'd and cached"""
+    cache_config = ocr_cache_config(config, preprocess)
+    scale = preprocess.scale if preprocess is not None else 1.0
+    pages = _prepare_pages(sources, language, config, cache, kind, preprocess)
+    metrics = get_metrics()
+    
+    if workers <= 1 and _ocr_pool is None:
+        for i, source, digest, data, ocr_source in pages:
+            print(f"OCR processing page {_progress(i, sources)}...")
+            if data is None:
+                try:
+                    with metrics.span('ocr', page=i):
+                        data = _ocr_with_backend(ocr_source, language, config, kind, scale)
+                except Exception as e:
+                    yield i, source, None, str(e)
+                    continue
+                if cache is not None:
+                    cache.put(digest, language, cache_config, data, kind)
+            yield i, source, data, None
+        return
+    
+    pending = deque()  # (index, source, image hash, future or cached result)
+    
+    def finish(entry):
+        index, page_source, digest, job = entry
+        if isinstance(job, bytes):
+            return index, page_source, job, None
+        data, error, seconds = job.result()
+        metrics.record_span('ocr', seconds, page=index, error='OCRError' if error else None)
+        if cache is not None and data is not None:
+            cache.put(digest, language, cache_config, data, kind)
+        return index, page_source, data, error
+    
+    if _ocr_pool is not None:
+        pool = nullcontext(_ocr_pool)  # Shared and long-lived - not shut down here
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_ocr_pool_context(),
+                                   initializer=_init_ocr_worker,
+                                   initargs=(find_tesseract() or 'tesseract', get_ocr_backend().name))
+    with pool as executor:
+        for i, source, digest, job, ocr_source in pages:
+            print(f"OCR processing page {_progress(i, sources)}...")
+            if job is None:
+                job = executor.submit(_ocr_page_job, ocr_source, language, config, kind, scale)
+            pending.append((i, source, digest, job))
+            while pending and (len(pending) >= 2 * workers or isinstance(pending[0][3], bytes)
+                               or pending[0][3].done()):
+                yield finish(pending.popleft())
+        while pending:
+            yield finish(pending.popleft())
+
+def image_only_pdf(source):
+    """Build a single-page image-only PDF in memory, for a page whose OCR failed"""
+    from image_pdf_writer import ImagePDFWriter
+    buffer = io.BytesIO()
+    writer = ImagePDFWriter(buffer)
+    writer.add_page(source)
+    writer.save()
+    return buffer.getvalue()
+
+def image_only_pdf_page(source):
+    """image_only_pdf as a PyPDF2 page object"""
+    from PyPDF2 import PdfReader
+    return PdfReader(io.BytesIO(image_only_pdf(source))).pages[0]
+
+def add_image_only_page(pdf_writer, i, source):
+    """Append page i to a PyPDF2 PdfWriter without a text layer"""
+    try:
+        pdf_writer.add_page(image_only_pdf_page(source))
+    except Exception as e:
+        print(f"❌ Page {i} could not be added: {str(e)}")
+
+def report_ocr_failures(failed_pages):
+    """Print the pages that went into the PDF without a text layer"""
+    if failed_pages:
+        print(f"⚠️  OCR failed for {len(failed_pages)} page(s), added without text: "
+              f"{', '.join(str(i) for i in failed_pages)}")
+
+def write_text_layer_pdf(results, output_pdf, failed_pages=None):
+    """
+    Write OCR'd pages to one PDF in a single pass with TextLayerPDFWriter
+    
+    Args:
+        results (iterable): (page index, source, TSV bytes or None, error or None) in
+            page order, as yielded by ocr_pages(kind='tsv'). Pages without TSV are
+            written image-only.
+        output_pdf (str): Output PDF path
+        failed_pages (list): Indices of pages written image-only are appended here
+        
+    Returns:
+        bool: False if there were no pages
+    """
+    from text_layer_pdf import TextLayerPDFWriter, parse_tsv_words
+    
+    metrics = get_metrics()
+    writer = TextLayerPDFWriter(output_pdf)
+    for i, source, tsv, error in results:
+        if tsv is None:
+            if error:
+                print(f"Warning: OCR failed for page {i}: {error}")
+            if failed_pages is not None:
+                failed_pages.append(i)
+        with metrics.span('pdf_write', page=i):
+            writer.add_page(source, parse_tsv_words(tsv) if tsv is not None else None)
+    with metrics.span('pdf_save'):
+        return writer.save()
+
+def create_pdf_without_ocr(image_dir, output_pdf, images=None):
+    """
+    Create a PDF from all JPG images in the specified directory (no OCR).
+    Fast and simple for cases where OCR is not needed.
+    Pass images instead of image_dir to build the PDF from in-memory pages.
+    JPEG (and PNG) data is embedded unchanged and every page is sized from its own
+    image header at 300 DPI, so no pixels are decoded or re-compressed.
+    """
+    from image_pdf_writer import ImagePDFWriter
+    
+    # Get page images in page order
+    sources = load_images(image_dir, images)
+    
+    metrics = get_metrics()
+    writer = ImagePDFWriter(output_pdf)
+    for i, source in enumerate(sources, 1):
+        print(f"Processing page {_progress(i, sources)}...")
+        with metrics.span('pdf_write', page=i):
+            writer.add_page(source)
+    
+    with metrics.span('pdf_save'):
+        saved = writer.save()
+    if not saved:
+        print(f"No JPG images found in {image_dir or 'the provided images'}")
+        return False
     
-    c.save()
     print(f"PDF created successfully: {output_pdf}")
     return True
 
-def create_pdf_with_ocrmypdf(image_dir, output_pdf, language='eng', high_quality_mode=False):
+def _run_ocrmypdf(ocrmypdf, sources, options):
+    """OCR page images with ocrmypdf.ocr() in-process; returns the searchable PDF as bytes"""
+    from image_pdf_writer import ImagePDFWriter
+    
+    input_pdf = io.BytesIO()
+    writer = ImagePDFWriter(input_pdf)
+    for source in sources:
+        writer.add_page(source)
+    writer.save()
+    input_pdf.seek(0)
+    
+    output_pdf = io.BytesIO()
+    with get_metrics().span('ocrmypdf'):
+        exit_code = ocrmypdf.ocr(input_pdf, output_pdf, **options)
+    if exit_code != ocrmypdf.ExitCode.ok:
+        raise RuntimeError(f"OCRmyPDF exited with {exit_code.name}")
+    return output_pdf.getvalue()
+
+def _same_failure(a, b):
+    return type(a) is type(b) and str(a) == str(b)
+
+def _ocrmypdf_page_fallback(source, i, error, language, ocr_cache, failed_pages):
+    """PDF bytes for one page OCRmyPDF failed on: plain Tesseract, else an image-only page"""
+    print(f"Warning: OCRmyPDF failed for page {i}: {str(error)}")
+    try:
+        if configure_tesseract():
+            print(f"🔧 Using Tesseract for page {i}...")
+            return [cached_ocr_page(source, language, cache=ocr_cache)]
+    except Exception as e:
+        print(f"Warning: OCR failed for page {i}: {str(e)}")
+    failed_pages.append(i)
+    try:
+        return [image_only_pdf(source)]
+    except Exception as e:
+        print(f"❌ Page {i} could not be added: {str(e)}")
+        return []
+
+def _ocrmypdf_pages(ocrmypdf, sources, start, end, options, language, ocr_cache, failed_pages,
+                    retry_options=None, error=None):
     """
-    Create a searchable PDF using OCRmyPDF - MUCH BETTER OCR QUALITY!
-    This is the recommended approach for OCR.
+    OCR sources[start:end] with OCRmyPDF, isolating pages that make it fail
+    
+    If the run fails and retry_options are given (minimal settings, for the whole
+    document), the range is first retried once with them. If that fails too, the
+    range is split in half and each half retried, so one bad page costs a few
+    extra runs over shrinking ranges instead of a rerun of the whole document.
+    Splitting stops when both halves fail for the same reason, since the failure
+    is then not down to particular pages. Pages that still fail fall back to plain
+    Tesseract, then to an image-only page.
+    
+    Args:
+        retry_options (dict): Settings to retry the whole range with before splitting it
+        error (Exception): Why this range already failed with `options`, so it is not run again
+    
+    Returns:
+        list: PDF bytes covering the range, in page order
+    
+    Raises:
+        ocrmypdf.exceptions.MissingDependencyError: If OCRmyPDF cannot run at all
     """
-    # First create a basic PDF from images
-    temp_pdf = output_pdf.replace('.pdf', '_temp.pdf')
+    if error is None:
+        try:
+            return [_run_ocrmypdf(ocrmypdf, sources[start:end], options)]
+        except ocrmypdf.exceptions.MissingDependencyError as e:
+            if retry_options is None:
+                raise
+            # e.g. unpaper for --clean: nothing has been OCR'd yet, so drop the optional steps
+            print(f"❌ OCRmyPDF is missing a dependency: {str(e)}")
+            error = e
+        except Exception as e:
+            error = e
     
-    print("Step 1: Creating PDF from images...")
-    if not create_pdf_without_ocr(image_dir, temp_pdf):
-        return False
+    if retry_options is not None:
+        print("\n💡 Trying with minimal settings...")
+        try:
+            return [_run_ocrmypdf(ocrmypdf, sources[start:end], retry_options)]
+        except ocrmypdf.exceptions.MissingDependencyError:
+            raise
+        except Exception as e:
+            if isinstance(error, ocrmypdf.exceptions.MissingDependencyError):
+                # The full settings cannot run here, so split with the minimal ones
+                options, error = retry_options, e
+    
+    if end - start > 1:
+        middle = (start + end) // 2
+        print(f"⚠️  OCRmyPDF failed on pages {start + 1}-{end}, retrying them in two halves...")
+        halves = []
+        for half_start, half_end in ((start, middle), (middle, end)):
+            try:
+                halves.append((half_start, half_end, [_run_ocrmypdf(ocrmypdf, sources[half_start:half_end], options)],
+                               None))
+            except ocrmypdf.exceptions.MissingDependencyError:
+                raise
+            except Exception as e:
+                halves.append((half_start, half_end, None, e))
+        (_, _, first, first_error), (_, _, second, second_error) = halves
+        if first is None and second is None and _same_failure(first_error, second_error):
+            print(f"⚠️  OCRmyPDF fails the same way on every part of pages {start + 1}-{end} - "
+                  f"not splitting further")
+        else:
+            parts = []
+            for half_start, half_end, part, half_error in halves:
+                parts += part if part is not None else _ocrmypdf_pages(
+                    ocrmypdf, sources, half_start, half_end, options, language, ocr_cache, failed_pages,
+                    error=half_error)
+            return parts
     
-    # Check if OCRmyPDF is installed
-    if not shutil.which('ocrmypdf'):
+    parts = []
+    for i in range(start, end):
+        parts += _ocrmypdf_page_fallback(sources[i], i + 1, error, language, ocr_cache, failed_pages)
+    return parts
+
+def create_pdf_with_ocrmypdf(image_dir, output_pdf, language='eng', high_quality_mode=False, images=None,
+                             ocr_cache=None, jobs=None):
+    """
+    Create a searchable PDF using OCRmyPDF - MUCH BETTER OCR QUALITY!
+    This is the recommended approach for OCR.
+    OCRmyPDF runs in-process through its Python API on `jobs` cores (default: all),
+    reading an image-only PDF built in memory. A failed run is retried once with
+    minimal settings; if that fails too, the pages that make it fail are retried
+    on their own and, if they still fail, OCR'd with plain Tesseract.
+    """
+    try:
+        import ocrmypdf
+    except ImportError:
         print("❌ OCRmyPDF not found!")
         print("Install with: pip install ocrmypdf")
         print("Also install system dependencies:")
@@ -77,7 +763,14 @@ def create_pdf_with_ocrmypdf(image_dir, output_pdf, language='eng', high_quality
         print("  Linux: apt install ocrmypdf")
         return False
     
-    print("Step 2: Running OCRmyPDF for superior OCR...")
+    # Page images are needed again if any pages have to be retried
+    sources = list(load_images(image_dir, images))
+    if not sources:
+        print(f"No JPG images found in {image_dir or 'the provided images'}")
+        return False
+    
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    print(f"Running OCRmyPDF for superior OCR ({jobs} jobs)...")
     
     # Remove existing output file if it exists to avoid permission errors
     if os.path.exists(output_pdf):
@@ -92,252 +785,359 @@ def create_pdf_with_ocrmypdf(image_dir, output_pdf, language='eng', high_quality
             output_pdf = output_pdf.replace('.pdf', f'_{timestamp}.pdf')
             print(f"Using alternative filename: {output_pdf}")
     
+    # Run OCRmyPDF with Windows-compatible settings
+    options = {
+        'language': [language],      # OCR language
+        'output_type': 'pdf',        # Regular PDF (not PDF/A) - editable by default
+        'optimize': 1,               # Light optimization to preserve image quality
+        'deskew': True,              # Correct skewed pages
+        'clean': True,               # Clean up image artifacts (needs unpaper)
+        'rotate_pages': True,        # Auto-rotate pages
+        'force_ocr': True,           # OCR even if text exists
+        'jobs': jobs,                # Pages OCR'd in parallel
+        'progress_bar': False,
+    }
+    if high_quality_mode:
+        # High quality settings - prioritize OCR accuracy over file size
+        options.update(oversample=450,    # Higher resolution for OCR processing (default 300)
+                       jpeg_quality=100,  # Maximum JPEG quality
+                       png_quality=100)   # Maximum PNG quality
+    else:
+        # Balanced settings
+        options.update(jpeg_quality=95,   # High JPEG quality (0-100, 95 = very high quality)
+                       png_quality=95)    # High PNG quality
+    minimal_options = {'language': [language], 'force_ocr': True, 'jobs': jobs, 'progress_bar': False}
+    
+    failed_pages = []
     try:
-        # Run OCRmyPDF with Windows-compatible settings (no unpaper dependency)
-        if high_quality_mode:
-            # High quality settings - prioritize OCR accuracy over file size
-            cmd = [
-                'ocrmypdf',
-                '--optimize', '1',           # Light optimization (0 disables image quality settings)
-                '--oversample', '450',       # Higher resolution for OCR processing (default 300)
-                '--deskew',                  # Correct skewed pages
-                '--clean',                   # Clean up image artifacts
-                '--language', language,      # OCR language
-                '--output-type', 'pdf',      # Regular PDF (not PDF/A) - editable by default
-                '--rotate-pages',            # Auto-rotate pages
-                '--force-ocr',              # OCR even if text exists
-                '--jpeg-quality', '100',     # Maximum JPEG quality
-                '--png-quality', '100',      # Maximum PNG quality
-                temp_pdf,
-                output_pdf
-            ]
-        else:
-            # Balanced settings
-            cmd = [
-                'ocrmypdf',
-                '--optimize', '1',           # Light optimization to preserve image quality
-                '--deskew',                  # Correct skewed pages
-                '--clean',                   # Clean up image artifacts (now that unpaper is installed)
-                '--language', language,      # OCR language
-                '--output-type', 'pdf',      # Regular PDF (not PDF/A) - editable by default
-                '--rotate-pages',            # Auto-rotate pages
-                '--force-ocr',              # OCR even if text exists
-                '--jpeg-quality', '95',      # High JPEG quality (0-100, 95 = very high quality)
-                '--png-quality', '95',       # High PNG quality  
-                temp_pdf,
-                output_pdf
-            ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(f"✅ OCR PDF created successfully: {output_pdf}")
-            # Clean up temp file
-            os.remove(temp_pdf)
-            return True
-        else:
-            print(f"❌ OCRmyPDF failed: {result.stderr}")
-            print("\n💡 Trying with minimal settings...")
-            
-            # Fallback: Try with absolutely minimal settings
-            cmd_simple = [
-                'ocrmypdf',
-                '--language', language,
-                '--force-ocr',
-                temp_pdf,
-                output_pdf
-            ]
-            
-            result = subprocess.run(cmd_simple, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                print(f"✅ OCR PDF created successfully with basic settings: {output_pdf}")
-                os.remove(temp_pdf)
-                return True
-            else:
-                print(f"❌ OCRmyPDF failed even with minimal settings: {result.stderr}")
-                print("\n🔧 Alternative: Using Tesseract fallback...")
-                return create_pdf_with_tesseract_fallback(image_dir, output_pdf, language)
-                
-    except Exception as e:
-        print(f"❌ Error running OCRmyPDF: {str(e)}")
-        print("🔧 Using Tesseract fallback...")
-        return create_pdf_with_tesseract_fallback(image_dir, output_pdf, language)
+        parts = _ocrmypdf_pages(ocrmypdf, sources, 0, len(sources), options, language, ocr_cache,
+                                failed_pages, retry_options=minimal_options)
+    except ocrmypdf.exceptions.MissingDependencyError as e:
+        print(f"❌ OCRmyPDF failed even with minimal settings: {str(e)}")
+        print("\n🔧 Alternative: Using Tesseract fallback...")
+        return create_pdf_with_tesseract_fallback(None, output_pdf, language, sources, ocr_cache)
+    
+    if not parts:
+        print("❌ No pages could be added to the PDF")
+        return False
+    
+    os.makedirs(os.path.dirname(output_pdf) or '.', exist_ok=True)
+    if len(parts) == 1:
+        with open(output_pdf, 'wb') as output_file:
+            output_file.write(parts[0])
+    else:
+        # Some pages were retried separately - stitch the pieces together in page order
+        from PyPDF2 import PdfWriter, PdfReader
+        pdf_writer = PdfWriter()
+        for part in parts:
+            for page in PdfReader(io.BytesIO(part)).pages:
+                pdf_writer.add_page(page)
+        with open(output_pdf, 'wb') as output_file:
+            pdf_writer.write(output_file)
+    
+    report_ocr_failures(failed_pages)
+    print(f"✅ OCR PDF created successfully: {output_pdf}")
+    return True
 
-def create_pdf_with_tesseract_default(image_dir, output_pdf, language='eng'):
+def create_pdf_with_tesseract_default(image_dir, output_pdf, language='eng', images=None, workers=None,
+                                      ocr_cache=None, text_layer=False, preprocess=None):
     """
     Create a searchable PDF using Tesseract directly - RECOMMENDED DEFAULT METHOD.
     Provides excellent balance of quality, file size, and OCR accuracy.
+    Pages are OCR'd on `workers` processes (default: one per CPU core); pages
+    already in ocr_cache (an OCRCache) are reused instead of OCR'd again.
+    With text_layer=True only Tesseract's word boxes are requested and the PDF is
+    written in one pass by TextLayerPDFWriter, instead of building a PDF per page
+    and merging them with PyPDF2. Only then can `preprocess` (an OCRPreprocessor)
+    give Tesseract a cleaned-up copy of each page while the original is embedded.
     """
     try:
-        import pytesseract
         from PyPDF2 import PdfWriter, PdfReader
-        import io
         
         print("Using Tesseract for OCR (recommended)...")
         
-        # Configure Tesseract path for Windows
-        tesseract_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Users\Public\Tesseract-OCR\tesseract.exe'
-        ]
-        
-        tesseract_found = False
-        for path in tesseract_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                tesseract_found = True
-                print(f"Found Tesseract at: {path}")
-                break
-        
-        if not tesseract_found:
-            print("❌ Tesseract not found! Please install Tesseract OCR")
-            print("Download from: https://github.com/UB-Mannheim/tesseract/wiki")
+        if not configure_tesseract():
             return False
         
-        # Get all jpg files
-        image_files = glob.glob(os.path.join(image_dir, 'page_*.jpg'))
-        image_files.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
+        # Get page images in page order
+        sources = load_images(image_dir, images)
+        workers = max(1, workers or os.cpu_count() or 1)
+        if workers > 1:
+            print(f"Running OCR on {workers} processes...")
         
-        if not image_files:
-            print(f"No JPG images found in {image_dir}")
-            return False
-        
-        # Create output directory
-        os.makedirs(os.path.dirname(output_pdf), exist_ok=True)
+        failed_pages = []
+        if text_layer:
+            results = ocr_pages(sources, language, TESSERACT_CONFIG, workers, ocr_cache, kind='tsv',
+                                preprocess=preprocess)
+            if not write_text_layer_pdf(results, output_pdf, failed_pages):
+                print(f"No JPG images found in {image_dir or 'the provided images'}")
+                return False
+            if preprocess is not None:
+                print(f"🧹 {preprocess.summary()}")
+            report_ocr_failures(failed_pages)
+            print(f"✅ Tesseract OCR PDF created: {output_pdf}")
+            return True
         
         # Create PDF with OCR
         pdf_writer = PdfWriter()
         
-        for i, image_file in enumerate(image_files, 1):
-            print(f"OCR processing page {i}/{len(image_files)}...")
-            
+        for i, source, pdf_bytes, error in ocr_pages(sources, language, TESSERACT_CONFIG, workers, ocr_cache):
             try:
-                # Get OCR data with optimized settings
-                img = Image.open(image_file)
-                
-                # Use Tesseract to create PDF with embedded text
-                pdf_bytes = pytesseract.image_to_pdf_or_hocr(
-                    img, 
-                    extension='pdf', 
-                    lang=language,
-                    config='--psm 1 --oem 3'  # Optimized OCR settings
-                )
+                if error:
+                    raise RuntimeError(error)
                 
                 # Create PDF page from OCR
-                pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
-                pdf_writer.add_page(pdf_reader.pages[0])
+                with get_metrics().span('pdf_write', page=i):
+                    pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
+                    pdf_writer.add_page(pdf_reader.pages[0])
                 
             except Exception as e:
                 print(f"Warning: OCR failed for page {i}: {str(e)}")
                 # Fall back to image-only page
-                temp_single_pdf = f"temp_page_{i}.pdf"
-                if create_pdf_without_ocr(os.path.dirname(image_file), temp_single_pdf):
-                    page_reader = PdfReader(temp_single_pdf)
-                    pdf_writer.add_page(page_reader.pages[0])
-                    os.remove(temp_single_pdf)
+                failed_pages.append(i)
+                add_image_only_page(pdf_writer, i, source)
+        
+        if not pdf_writer.pages:
+            print(f"No JPG images found in {image_dir or 'the provided images'}")
+            return False
+        
+        # Create output directory
+        os.makedirs(os.path.dirname(output_pdf) or '.', exist_ok=True)
         
         # Save final PDF
-        with open(output_pdf, 'wb') as output_file:
+        with get_metrics().span('pdf_save'), open(output_pdf, 'wb') as output_file:
             pdf_writer.write(output_file)
         
+        report_ocr_failures(failed_pages)
         print(f"✅ Tesseract OCR PDF created: {output_pdf}")
         return True
         
     except ImportError:
-        print("❌ PyPDF2 and pytesseract not available")
-        print("Installing required dependencies...")
+        print("❌ PyPDF2 not available")
+        print("Install with: pip install PyPDF2")
+        return False
+    except Exception as e:
+        print(f"❌ Tesseract OCR failed: {str(e)}")
+        return False
+
+def create_pdf_pipelined(image_dir, output_pdf, language='eng', images=None, ocr_workers=2, queue_size=None,
+                         ocr_cache=None, text_layer=False, preprocess=None):
+    """
+    Create a searchable PDF with Tesseract while pages are still arriving.
+    
+    A producer thread pulls pages (for example from
+    DocSendImageDownloader.iter_page_images, which downloads as it is iterated)
+    into a bounded queue, and OCR worker threads start on each page as soon as it
+    lands. When the OCR workers fall behind, the full queue blocks the producer,
+    which in turn stops the downloader from fetching further ahead, so memory stays
+    bounded. Wall-clock time approaches max(download, OCR) rather than their sum.
+    Finished pages are added to the PDF in page order as soon as they are ready.
+    
+    Args:
+        image_dir (str): Directory of page images (ignored when images is given)
+        output_pdf (str): Output PDF path
+        language (str): Tesseract language
+        images (iterable): In-memory pages, as accepted by load_images
+        ocr_workers (int): Pages OCR'd concurrently (each runs its own tesseract process)
+        queue_size (int): Pages allowed to wait for OCR (default 2 x ocr_workers)
+        ocr_cache (OCRCache): Reuse OCR results for pages seen before (optional)
+        text_layer (bool): Write the PDF in one pass from word boxes (TextLayerPDFWriter)
+            instead of merging Tesseract's per-page PDFs with PyPDF2
+        preprocess (OCRPreprocessor): OCR a cleaned-up copy of each page (text_layer only)
+    """
+    try:
+        from PyPDF2 import PdfWriter, PdfReader
+    except ImportError:
+        print("❌ PyPDF2 not available")
+        print("Install with: pip install PyPDF2")
+        return False
+    from text_layer_pdf import TextLayerPDFWriter, parse_tsv_words
+    
+    if not configure_tesseract():
+        return False
+    
+    ocr_workers = max(1, ocr_workers)
+    if ocr_workers > 1:
+        limit_tesseract_threads()
+    kind = 'tsv' if text_layer else 'pdf'
+    pending = queue.Queue(maxsize=queue_size or 2 * ocr_workers)
+    results = {}  # page index -> (OCR result bytes or None if OCR failed, source)
+    finished = threading.Condition()
+    running = [ocr_workers]
+    producer_errors = []
+    stop = threading.Event()  # Set if writing the PDF fails, so the other threads wind down
+    started = time.time()
+    
+    def produce():
         try:
-            subprocess.run(['pip', 'install', 'pytesseract', 'PyPDF2'], check=True)
-            return create_pdf_with_tesseract_default(image_dir, output_pdf, language)
-        except:
-            print("❌ Failed to install dependencies")
+            for i, source in enumerate(load_images(image_dir, images), 1):
+                while not stop.is_set():
+                    try:
+                        pending.put((i, source), timeout=0.1)  # Waits while the OCR workers are busy
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    break
+        except Exception as e:
+            producer_errors.append(e)
+        finally:
+            if stop.is_set() and hasattr(images, 'close'):
+                images.close()  # e.g. stop iter_page_images from downloading further
+            for _ in range(ocr_workers):
+                pending.put(None)
+    
+    def consume():
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            if stop.is_set():
+                continue  # Drain the queue so the producer can finish
+            i, source = item
+            print(f"OCR processing page {i}...")
+            try:
+                result = (cached_ocr_page(source, language, cache=ocr_cache, kind=kind, preprocess=preprocess,
+                                          page=i),
+                          source)
+            except Exception as e:
+                print(f"Warning: OCR failed for page {i}: {str(e)}")
+                result = (None, source)
+            with finished:
+                results[i] = result
+                finished.notify_all()
+        with finished:
+            running[0] -= 1
+            finished.notify_all()
+    
+    def ordered_results():
+        """Yield (index, source, data) in page order as pages finish"""
+        next_page = 1
+        while True:
+            with finished:
+                finished.wait_for(lambda: next_page in results or not running[0])
+                if next_page not in results:
+                    return
+                data, source = results.pop(next_page)
+            yield next_page, source, data
+            next_page += 1
+    
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=consume, daemon=True) for _ in range(ocr_workers)]
+    for thread in threads:
+        thread.start()
+    
+    metrics = get_metrics()
+    failed_pages = []
+    try:
+        if text_layer:
+            pdf_writer = TextLayerPDFWriter(output_pdf)
+            for i, source, tsv in ordered_results():
+                if tsv is None:
+                    failed_pages.append(i)
+                with metrics.span('pdf_write', page=i):
+                    pdf_writer.add_page(source, parse_tsv_words(tsv) if tsv is not None else None)
+            page_count = pdf_writer.page_count
+        else:
+            pdf_writer = PdfWriter()
+            for i, source, pdf_bytes in ordered_results():
+                if pdf_bytes is not None:
+                    with metrics.span('pdf_write', page=i):
+                        pdf_writer.add_page(PdfReader(io.BytesIO(pdf_bytes)).pages[0])
+                    continue
+                # Fall back to image-only page
+                failed_pages.append(i)
+                add_image_only_page(pdf_writer, i, source)
+            page_count = len(pdf_writer.pages)
+    
+        for thread in threads:
+            thread.join()
+    
+        if producer_errors:
+            print(f"❌ Failed to read pages: {producer_errors[0]}")
+            return False
+        if not page_count:
+            print(f"No JPG images found in {image_dir or 'the provided images'}")
             return False
+    
+        with metrics.span('pdf_save'):
+            if text_layer:
+                pdf_writer.save()
+            else:
+                os.makedirs(os.path.dirname(output_pdf) or '.', exist_ok=True)
+                with open(output_pdf, 'wb') as output_file:
+                    pdf_writer.write(output_file)
     except Exception as e:
-        print(f"❌ Tesseract OCR failed: {str(e)}")
+        stop.set()
+        for thread in threads:
+            thread.join()
+        print(f"❌ Pipelined OCR failed: {str(e)}")
         return False
+    
+    if text_layer and preprocess is not None:
+        print(f"🧹 {preprocess.summary()}")
+    report_ocr_failures(failed_pages)
+    print(f"✅ Pipelined OCR PDF created: {output_pdf} "
+          f"({page_count} pages in {time.time() - started:.1f}s)")
+    return True
 
-def create_pdf_with_tesseract_fallback(image_dir, output_pdf, language='eng'):
+def create_pdf_with_tesseract_fallback(image_dir, output_pdf, language='eng', images=None, ocr_cache=None):
     """
     Fallback OCR method using Tesseract directly when OCRmyPDF fails.
     Better than the original implementation but not as good as OCRmyPDF.
     """
     try:
-        import pytesseract
         from PyPDF2 import PdfWriter, PdfReader
-        import io
-        from reportlab.lib.colors import Color
         
         print("Using Tesseract fallback for OCR...")
         
-        # Configure Tesseract path for Windows
-        tesseract_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Users\Public\Tesseract-OCR\tesseract.exe'
-        ]
-        
-        tesseract_found = False
-        for path in tesseract_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                tesseract_found = True
-                print(f"Found Tesseract at: {path}")
-                break
-        
-        if not tesseract_found:
-            print("❌ Tesseract not found! Please install Tesseract OCR")
-            print("Download from: https://github.com/UB-Mannheim/tesseract/wiki")
-            return False
-        
-        # Get all jpg files
-        image_files = glob.glob(os.path.join(image_dir, 'page_*.jpg'))
-        image_files.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
-        
-        if not image_files:
-            print(f"No JPG images found in {image_dir}")
+        if not configure_tesseract():
             return False
         
-        # Create output directory
-        os.makedirs(os.path.dirname(output_pdf), exist_ok=True)
+        # Get page images in page order
+        sources = load_images(image_dir, images)
         
         # Create PDF with OCR
         pdf_writer = PdfWriter()
+        failed_pages = []
         
-        for i, image_file in enumerate(image_files, 1):
-            print(f"OCR processing page {i}/{len(image_files)}...")
+        for i, source in enumerate(sources, 1):
+            print(f"OCR processing page {_progress(i, sources)}...")
             
             try:
                 # Get OCR data
-                img = Image.open(image_file)
-                pdf_bytes = pytesseract.image_to_pdf_or_hocr(img, extension='pdf', lang=language)
+                pdf_bytes = cached_ocr_page(source, language, config='', cache=ocr_cache, page=i)
                 
                 # Create PDF page from OCR
-                pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
-                pdf_writer.add_page(pdf_reader.pages[0])
+                with get_metrics().span('pdf_write', page=i):
+                    pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
+                    pdf_writer.add_page(pdf_reader.pages[0])
                 
             except Exception as e:
                 print(f"Warning: OCR failed for page {i}: {str(e)}")
                 # Fall back to image-only page
-                if not create_pdf_without_ocr(os.path.dirname(image_file), f"temp_page_{i}.pdf"):
-                    continue
-                page_reader = PdfReader(f"temp_page_{i}.pdf")
-                pdf_writer.add_page(page_reader.pages[0])
-                os.remove(f"temp_page_{i}.pdf")
+                failed_pages.append(i)
+                add_image_only_page(pdf_writer, i, source)
+        
+        if not pdf_writer.pages:
+            print(f"No JPG images found in {image_dir or 'the provided images'}")
+            return False
+        
+        # Create output directory
+        os.makedirs(os.path.dirname(output_pdf) or '.', exist_ok=True)
         
         # Save final PDF
-        with open(output_pdf, 'wb') as output_file:
+        with get_metrics().span('pdf_save'), open(output_pdf, 'wb') as output_file:
             pdf_writer.write(output_file)
         
+        report_ocr_failures(failed_pages)
         print(f"✅ Fallback OCR PDF created: {output_pdf}")
         return True
         
     except ImportError:
-        print("❌ PyPDF2 and pytesseract not available for fallback")
-        print("Installing fallback dependencies...")
-        subprocess.run(['pip', 'install', 'pytesseract', 'PyPDF2'], check=True)
-        return create_pdf_with_tesseract_fallback(image_dir, output_pdf, language)
+        print("❌ PyPDF2 not available for fallback")
+        print("Install with: pip install PyPDF2")
+        return False
     except Exception as e:
         print(f"❌ Fallback OCR failed: {str(e)}")
         return False
@@ -351,22 +1151,49 @@ def main():
     use_ocr = True  # Set to True for OCR, False for simple PDF
     use_premium_ocr = False  # Set to True for OCRmyPDF (premium quality), False for Tesseract (recommended)
     language = 'eng'  # OCR language: 'eng', 'fra', 'deu', etc.
+    text_layer_pdf = True  # Draw Tesseract's word boxes over each image in one pass (False = merge per-page PDFs)
+    ocr_backend = 'subprocess'  # 'tesserocr' keeps Tesseract loaded in each worker (pip install tesserocr)
+    ocr_preprocess = False  # OCR a grayscale, binarized copy of each page (text_layer_pdf only; the PDF keeps the original)
+    output_profile = None  # None = keep the PDF as built, or 'archive', 'balanced', 'compact' (smaller, lower-DPI images)
+    metrics_jsonl = None  # e.g. 'metrics/compile.jsonl' - per-page stage timings and counters
+    
+    use_ocr_backend(ocr_backend)
+    if metrics_jsonl:
+        set_metrics(Metrics(jsonl_path=metrics_jsonl))
     
     # Output PDF file
     if use_ocr:
         if use_premium_ocr:
             output_pdf = f'pdf_documents/{image_subfolder}_searchable_premium.pdf'
             print("🔍 Creating PREMIUM searchable PDF with OCRmyPDF...")
-            success = create_pdf_with_ocrmypdf(image_dir, output_pdf, language, high_quality_mode=True)
+            success = create_pdf_with_ocrmypdf(image_dir, output_pdf, language, high_quality_mode=True,
+                                               ocr_cache=OCRCache())
         else:
             output_pdf = f'pdf_documents/{image_subfolder}.pdf'
             print("🔍 Creating searchable PDF with Tesseract (RECOMMENDED)...")
-            success = create_pdf_with_tesseract_default(image_dir, output_pdf, language)
+            preprocess = None
+            if ocr_preprocess:
+                from ocr_preprocess import OCRPreprocessor
+                preprocess = OCRPreprocessor()
+            success = create_pdf_with_tesseract_default(image_dir, output_pdf, language, ocr_cache=OCRCache(),
+                                                        text_layer=text_layer_pdf, preprocess=preprocess)
     else:
         output_pdf = f'pdf_documents/{image_subfolder}.pdf'
         print("📄 Creating simple PDF without OCR...")
         success = create_pdf_without_ocr(image_dir, output_pdf)
     
+    if success and output_profile:
+        from output_profiles import apply_output_profile, describe_result
+        result = apply_output_profile(output_pdf, profile=output_profile)
+        if result:
+            print(f"📦 {describe_result(result)}")
+    
+    metrics = get_metrics()
+    if metrics.enabled:
+        print(f"⏱️  {metrics.summary()}")
+        metrics.export()
+        metrics.close()
+    
     if success:
         print(f"✅ Complete! Output: {output_pdf}")
         if use_ocr and not use_premium_ocr:
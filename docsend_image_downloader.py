@@ -1,32 +1,108 @@
 import requests
 import os
 import time
+import hashlib
 import json
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from urllib.parse import urlparse, parse_qs
+from metrics import get_metrics
+from rate_limiter import get_shared_rate_limiter, parse_retry_after
+from transport import connection_stats, mount_transport, supported_accept_encoding
+from download_manifest import (
+    load_manifest, make_page_entry, new_manifest, save_manifest, verify_page
+)
+
+# Places the total page count has been seen in the document view page. The view
+# page can embed other documents too, so a count found here (or in page_data)
+# is only trusted once the pages themselves agree (_confirm_page_count).
+PAGE_COUNT_PATTERNS = [
+    re.compile(r'data-page-count="(\d+)"'),
+    re.compile(r'"page_?[cC]ount"\s*:\s*(\d+)'),
+    re.compile(r'"(?:total_?[pP]ages|num_?[pP]ages)"\s*:\s*(\d+)'),
+]
+
+# Keys that may carry the total page count in a page_data payload
+PAGE_COUNT_KEYS = ('pageCount', 'page_count', 'totalPages', 'numPages')
+
+# Bytes read per chunk when streaming images to disk
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+# Transient failures worth retrying, and failures that no retry will fix
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+FATAL_STATUS_CODES = (401, 403)
+
+class AuthenticationError(requests.exceptions.HTTPError):
+    """DocSend refused the session cookies - every further request will fail too"""
+
+def request_kind(url):
+    """Label a request as 'page_data', 'view' or 'image' for metrics"""
+    if '/page_data/' in url:
+        return 'page_data'
+    if '/view/' in url:
+        return 'view'
+    return 'image'
 
 class DocSendImageDownloader:
-    def __init__(self, cookies=None, user_agent=None):
+    def __init__(self, cookies=None, user_agent=None, max_workers=1, rate_limiter=None,
+                 max_retries=3, backoff_base=1.0, backoff_max=30.0, http_cache=None,
+                 image_store=None, pool_maxsize=None, pool_block=False, keep_alive=True,
+                 http2=False, request_slots=None):
         """
         Initialize DocSend image downloader with authentication
         
         Args:
             cookies (dict): Dictionary of cookies from browser session
             user_agent (str): User agent string (optional)
+            max_workers (int): Number of pages fetched concurrently (default 1 = sequential)
+            rate_limiter (AdaptiveRateLimiter): Limiter for all requests (default: shared process-wide)
+            max_retries (int): Retries for connection errors and retryable status codes
+            backoff_base (float): First retry delay in seconds, doubled on each attempt
+            backoff_max (float): Upper bound for a single retry delay in seconds
+            http_cache (HTTPCache): On-disk cache for conditional requests (optional)
+            image_store (ImageStore): Content-addressed store that page files link into (optional)
+            pool_maxsize (int): Connections kept open per host (default: enough for max_workers)
+            pool_block (bool): Wait for a pooled connection instead of opening extra ones
+            keep_alive (bool): Reuse connections between requests
+            http2 (bool): Use an HTTP/2 transport when httpx[http2] is installed
+            request_slots (threading.Semaphore): Shared by several downloaders to cap the
+                requests they have in flight together (optional). A slot is held until
+                the body has been read - for a streamed image, until the response is closed
         """
         self.session = requests.Session()
+        self.max_workers = max(1, int(max_workers))
+        # Page data and image requests overlap, so allow two connections per worker
+        self.adapter = mount_transport(
+            self.session,
+            pool_maxsize=pool_maxsize or max(10, 2 * self.max_workers),
+            pool_block=pool_block,
+            http2=http2
+        )
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http_cache = http_cache
+        self.image_store = image_store
+        self.request_slots = request_slots
+        self.failed_pages = {}  # page number -> error, from the last download run
+        self._manifests = {}  # output directory -> manifest being updated
+        self._manifest_lock = threading.Lock()
         
         # Set default headers that mimic a real browser
         self.headers = {
             'User-Agent': user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/javascript, */*; q=0.01',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': supported_accept_encoding(),
             'X-Requested-With': 'XMLHttpRequest',
             'Referer': 'https://docsend.com/',
             'Sec-Fetch-Dest': 'empty',
             'Sec-Fetch-Mode': 'cors',
             'Sec-Fetch-Site': 'same-origin',
-            'Connection': 'keep-alive',
+            'Connection': 'keep-alive' if keep_alive else 'close',
             'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
             'Sec-Ch-Ua-Mobile': '?0',
             'Sec-Ch-Ua-Platform': '"Windows"'
@@ -41,6 +117,130 @@ class DocSendImageDownloader:
         
         # Initialize without hardcoded cookies - they should be provided by user
     
+    def connection_stats(self, since=None):
+        """
+        Return request, connection and reuse counts for the shared session
+        
+        Args:
+            since (dict): An earlier result; counts are then only those since it was
+                taken (including requests of other runs sharing this downloader)
+        """
+        return connection_stats(self.adapter, since)
+
+    def _send(self, url, **kwargs):
+        """
+        session.get, holding a request slot (if configured) until the body has been read
+        
+        Without stream=True requests reads the body before returning. A streamed body
+        is read by the caller afterwards, so its slot is released when the response
+        is closed; callers close streamed responses in a finally block.
+        """
+        slots = self.request_slots
+        if slots is None:
+            return self.session.get(url, **kwargs)
+        slots.acquire()
+        try:
+            response = self.session.get(url, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        if not kwargs.get('stream'):
+            slots.release()
+            return response
+        
+        close = response.close
+        released = []
+        
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    slots.release()
+        
+        response.close = close_and_release
+        return response
+
+    @staticmethod
+    def _release(response):
+        """
+        Finish with a response whose body isn't needed
+        
+        The body is read first: closing a streamed response with its body unread
+        closes the connection too, instead of returning it to the pool.
+        """
+        response.content
+        response.close()
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Exponential backoff with full jitter, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, parse_retry_after(retry_after) or 0)
+
+    def _get(self, url, **kwargs):
+        """
+        Send a GET through the rate limiter, retrying transient failures
+        
+        Connection errors, timeouts and RETRYABLE_STATUS_CODES are retried up to
+        max_retries times with backoff. The final response is returned as is, so
+        callers still decide how to treat error statuses.
+        """
+        metrics = get_metrics()
+        kind = request_kind(url)
+        for attempt in range(self.max_retries + 1):
+            waited = time.perf_counter()
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            metrics.observe('rate_limit_wait_seconds', started - waited, kind=kind)
+            try:
+                response = self._send(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                metrics.increment('http_requests_total', kind=kind, status=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                metrics.increment('http_retries_total', kind=kind, reason=type(e).__name__)
+                print(f"⚠️  {type(e).__name__} - retrying ({attempt + 1}/{self.max_retries})")
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            
+            metrics.observe('http_request_seconds', time.perf_counter() - started, kind=kind)
+            metrics.increment('http_requests_total', kind=kind, status=response.status_code)
+            retry_after = response.headers.get('Retry-After')
+            self.rate_limiter.record_response(response.status_code, retry_after)
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                return response
+            
+            metrics.increment('http_retries_total', kind=kind, reason=response.status_code)
+            print(f"⚠️  HTTP {response.status_code} - retrying ({attempt + 1}/{self.max_retries})")
+            self._release(response)
+            time.sleep(self._backoff_delay(attempt, retry_after))
+
+    def _get_conditional(self, url, **kwargs):
+        """
+        GET that revalidates against the HTTP cache when one is configured
+        
+        Returns:
+            tuple: (response, cached body path) - the path is set only for a 304
+            whose body is still in the cache
+        """
+        if not self.http_cache:
+            return self._get(url, **kwargs), None
+        
+        headers = dict(kwargs.pop('headers', None) or self.headers)
+        conditional = self.http_cache.conditional_headers(url)
+        response = self._get(url, headers=dict(headers, **conditional), **kwargs)
+        if response.status_code != 304:
+            return response, None
+        
+        self._release(response)
+        cached_path = self.http_cache.body_path(url)
+        if cached_path:
+            get_metrics().increment('http_cache_hits_total', kind=request_kind(url))
+            return response, cached_path
+        # Evicted between the lookup and the 304 - fetch the full body
+        return self._get(url, headers=headers, **kwargs), None
+    
     def extract_document_info_from_url(self, docsend_url):
         """
         Extract document_id and view_id from a DocSend URL
@@ -68,19 +268,26 @@ class DocSendImageDownloader:
             print(f"❌ Error parsing URL: {e}")
             return None, None
     
-    def get_page_data(self, document_id, view_id, page_number):
-        """Get page data from DocSend API"""
+    def _view_url(self, document_id, view_id):
         if view_id:
-            url = f'{self.base_url}/view/{document_id}/d/{view_id}/page_data/{page_number}'
-        else:
-            url = f'{self.base_url}/view/{document_id}/page_data/{page_number}'
+            return f'{self.base_url}/view/{document_id}/d/{view_id}'
+        return f'{self.base_url}/view/{document_id}'
+
+    def _page_data_request(self, document_id, view_id, page_number):
+        """Build the URL and query parameters for a page_data request"""
+        url = f'{self._view_url(document_id, view_id)}/page_data/{page_number}'
         params = {
             'viewLoadTime': int(time.time()),
             'timezoneOffset': int(time.timezone / 3600) * 3600  # Dynamic timezone offset
         }
+        return url, params
+
+    def get_page_data(self, document_id, view_id, page_number):
+        """Get page data from DocSend API"""
+        url, params = self._page_data_request(document_id, view_id, page_number)
         
         try:
-            response = self.session.get(url, headers=self.headers, params=params)
+            response = self._get(url, headers=self.headers, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
@@ -99,66 +306,591 @@ class DocSendImageDownloader:
             print(f"❌ Error fetching page data: {e}")
             return None
 
+    def page_exists(self, document_id, view_id, page_number):
+        """
+        Quietly check whether a page has an image, without printing errors
+        
+        Returns:
+            bool: True if the page has an image, False if it is absent (404, or page
+                data without an image URL), None if the check failed for any other
+                reason (errors after retries, 403, a broken response)
+        """
+        url, params = self._page_data_request(document_id, view_id, page_number)
+        try:
+            response = self._get(url, headers=self.headers, params=params)
+            if response.status_code == 404:
+                return False
+            if response.status_code != 200:
+                return None
+            return 'imageUrl' in response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+
+    def _confirm_page_count(self, document_id, view_id, count):
+        """
+        Check a page count against the pages: page count + 1 must be absent and page
+        count present. A check that fails for another reason doesn't rule it out.
+        """
+        if self.page_exists(document_id, view_id, count + 1):
+            return False
+        return self.page_exists(document_id, view_id, count) is not False
+
+    def get_page_count(self, document_id, view_id):
+        """
+        Discover the total number of pages before downloading starts
+        
+        Tries the document view page first, then the page_data payload of page 1,
+        and finally falls back to exponential probing followed by a binary search.
+        A count from the view page or page_data is used only if page count + 1 is
+        missing and page count is not. Probing gives up if any probe fails for a
+        reason other than a missing page, since a transient error would otherwise
+        make the count too low.
+        
+        Returns:
+            int: Total page count, or None if it could not be determined
+        """
+        # 1. Page count embedded in the view page
+        candidates = []
+        try:
+            html_headers = dict(self.headers, Accept='text/html,application/xhtml+xml')
+            html_headers.pop('X-Requested-With', None)
+            response = self._get(self._view_url(document_id, view_id), headers=html_headers)
+            if response.status_code == 200:
+                for pattern in PAGE_COUNT_PATTERNS:
+                    for match in pattern.finditer(response.text):
+                        count = int(match.group(1))
+                        if count > 0 and count not in candidates:
+                            candidates.append(count)
+        except requests.exceptions.RequestException:
+            pass
+        for count in candidates[:3]:
+            if self._confirm_page_count(document_id, view_id, count):
+                return count
+            print(f"⚠️  The view page mentions {count} pages, but the pages disagree - ignoring it")
+        
+        # 2. Page count in the page_data payload
+        url, params = self._page_data_request(document_id, view_id, 1)
+        try:
+            response = self._get(url, headers=self.headers, params=params)
+            if response.status_code != 200:
+                return None
+            page_data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+        if 'imageUrl' not in page_data:
+            return None
+        for key in PAGE_COUNT_KEYS:
+            count = page_data.get(key)
+            if isinstance(count, int) and count > 0 and count not in candidates:
+                if self._confirm_page_count(document_id, view_id, count):
+                    return count
+                break
+        
+        # 3. Probe: double until a page is missing, then binary search the gap
+        last_present = 1
+        probe = 2
+        while True:
+            exists = self.page_exists(document_id, view_id, probe)
+            if exists is None:
+                return None
+            if not exists:
+                break
+            last_present = probe
+            probe *= 2
+        first_missing = probe
+        while first_missing - last_present > 1:
+            middle = (last_present + first_missing) // 2
+            exists = self.page_exists(document_id, view_id, middle)
+            if exists is None:
+                return None
+            if exists:
+                last_present = middle
+            else:
+                first_missing = middle
+        return last_present
+
+    def _fetch_image(self, image_url, output_dir, page_number):
+        """
+        Stream an image to page_NNN.jpg and hash it on the way
+        
+        The body is written in chunks to a .part file that is renamed into place only
+        once complete, so an interrupted download never looks like a finished page.
+        With an image store, the finished file becomes a blob and the page links to it.
+        
+        Returns:
+            tuple: (file path, byte size, SHA-256 hex digest)
+        """
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+        
+        filename = f'page_{page_number:03d}.jpg'
+        filepath = os.path.join(output_dir, filename)
+        temp_path = filepath + '.part'
+        
+        response, cached_path = self._get_conditional(image_url, headers=self.headers, stream=True)
+        try:
+            if cached_path:
+                with open(cached_path, 'rb') as cached:
+                    chunks = iter(lambda: cached.read(IMAGE_CHUNK_SIZE), b'')
+                    size, digest = self._write_chunks(temp_path, chunks)
+            else:
+                response.raise_for_status()
+                size, digest = self._write_chunks(
+                    temp_path, response.iter_content(chunk_size=IMAGE_CHUNK_SIZE))
+            if self.image_store:
+                blob = self.image_store.add_file(temp_path, digest.hexdigest())
+                self.image_store.link(blob, filepath)
+            else:
+                os.replace(temp_path, filepath)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            response.close()
+        
+        if cached_path:
+            print(f"✅ Page {page_number} unchanged - reused cached image")
+        else:
+            get_metrics().increment('http_bytes_total', size, kind='image')
+            if self.http_cache:
+                self.http_cache.store_file(image_url, response.headers, filepath)
+            print(f"✅ Downloaded page {page_number}")
+        return filepath, size, digest.hexdigest()
+
+    @staticmethod
+    def _write_chunks(path, chunks):
+        """Write chunks to path, returning (byte size, SHA-256 hash object)"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        return size, digest
+
     def download_image(self, image_url, output_dir, page_number):
         """Download image from the provided URL"""
         try:
-            response = self.session.get(image_url, headers=self.headers)
-            response.raise_for_status()
-            
-            # Create output directory if it doesn't exist
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Generate filename from URL or use page number
-            filename = f'page_{page_number:03d}.jpg'
-            filepath = os.path.join(output_dir, filename)
+            filepath, _, _ = self._fetch_image(image_url, output_dir, page_number)
+            return filepath
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error downloading image for page {page_number}: {e}")
+            raise
+
+    def _record_page(self, output_dir, page_number, filepath, image_url, size, sha256):
+        """Add a finished page to the output directory's manifest"""
+        entry = make_page_entry(os.path.basename(filepath), image_url, size, sha256)
+        with self._manifest_lock:
+            manifest = self._manifests.get(output_dir) or load_manifest(output_dir) or new_manifest()
+            manifest['pages'][str(page_number)] = entry
+            self._manifests[output_dir] = manifest
+            save_manifest(output_dir, manifest)
+
+    def _load_resumable_pages(self, document_id, view_id, output_dir):
+        """
+        Load the manifest for output_dir and verify the pages it lists
+        
+        Returns:
+            dict: page number -> file path for pages that are intact on disk
+        """
+        manifest = load_manifest(output_dir)
+        if manifest and (manifest.get('document_id'), manifest.get('view_id')) != (document_id, view_id):
+            print(f"⚠️  Manifest in {output_dir} belongs to another document - starting fresh")
+            manifest = None
+        if manifest is None:
+            manifest = new_manifest(document_id, view_id)
+        
+        existing = {}
+        for key, entry in list(manifest['pages'].items()):
+            if verify_page(output_dir, entry):
+                existing[int(key)] = os.path.join(output_dir, entry['file'])
+            else:
+                print(f"⚠️  Page {key} is missing or corrupt - will download again")
+                del manifest['pages'][key]
+        
+        with self._manifest_lock:
+            self._manifests[output_dir] = manifest
+        return existing
+
+    @staticmethod
+    def _parse_page_data(response, page_number):
+        """Return the page_data payload, None for a missing page, or raise for other failures"""
+        if response.status_code == 404:
+            print(f"❌ 404 Not Found - Page {page_number} doesn't exist")
+            return None
+        if response.status_code in FATAL_STATUS_CODES:
+            raise AuthenticationError(f"{response.status_code} for page {page_number}", response=response)
+        response.raise_for_status()
+        
+        try:
+            return response.json()
+        except ValueError as e:
+            raise requests.exceptions.RequestException(f"Invalid page data for page {page_number}: {e}")
+
+    def _fetch_image_url(self, document_id, view_id, page_number, total_pages=None):
+        """
+        Fetch a page's page_data and return its image URL
+        
+        Returns:
+            str: The image URL, or None if the page does not exist
             
-            # Save the image
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+        Raises:
+            AuthenticationError: If DocSend rejects the session
+            requests.exceptions.RequestException: If the page still fails after retries
+        """
+        if total_pages:
+            print(f"📄 Processing page {page_number}/{total_pages}...")
+        else:
+            print(f"📄 Processing page {page_number}...")
+        url, params = self._page_data_request(document_id, view_id, page_number)
+        response, cached_path = self._get_conditional(url, headers=self.headers, params=params)
+        
+        if cached_path:
+            with open(cached_path, 'rb') as f:
+                page_data = json.loads(f.read())
+        else:
+            page_data = self._parse_page_data(response, page_number)
+            if page_data is None:
+                return None
+            get_metrics().increment('http_bytes_total', len(response.content), kind='page_data')
+            if self.http_cache:
+                self.http_cache.store_bytes(url, response.headers, response.content)
+        
+        if 'imageUrl' not in page_data:
+            print(f"❌ No image URL found for page {page_number}")
+            return None
+        return page_data['imageUrl']
+
+    def _fetch_image_bytes(self, image_url, page_number):
+        """Fetch an image into memory, revalidating against the HTTP cache"""
+        try:
+            response, cached_path = self._get_conditional(image_url, headers=self.headers)
+            if cached_path:
+                with open(cached_path, 'rb') as f:
+                    data = f.read()
+                print(f"✅ Page {page_number} unchanged - reused cached image")
+                return data
+            response.raise_for_status()
+            data = response.content
+            get_metrics().increment('http_bytes_total', len(data), kind='image')
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error downloading image for page {page_number}: {e}")
+            raise
+        
+        if self.http_cache:
+            self.http_cache.store_bytes(image_url, response.headers, data)
+        print(f"✅ Downloaded page {page_number}")
+        return data
+
+    def _save_image_bytes(self, data, image_url, output_dir, page_number):
+        """Write an in-memory image to page_NNN.jpg atomically and record it in the manifest"""
+        os.makedirs(output_dir, exist_ok=True)
+        filepath = os.path.join(output_dir, f'page_{page_number:03d}.jpg')
+        temp_path = filepath + '.part'
+        sha256 = hashlib.sha256(data).hexdigest()
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            if self.image_store:
+                self.image_store.link(self.image_store.add_file(temp_path, sha256), filepath)
+            else:
+                os.replace(temp_path, filepath)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._record_page(output_dir, page_number, filepath, image_url, len(data), sha256)
+        return filepath
+
+    def download_page(self, document_id, view_id, page_number, output_dir, total_pages=None):
+        """
+        Fetch page data and the slide image for a single page
+        
+        Returns:
+            str: Path of the saved image, or None if the page does not exist
             
-            print(f"✅ Downloaded page {page_number}")
-            return filepath
+        Raises:
+            AuthenticationError: If DocSend rejects the session
+            requests.exceptions.RequestException: If the page still fails after retries
+        """
+        metrics = get_metrics()
+        with metrics.span('page_data', page=page_number):
+            image_url = self._fetch_image_url(document_id, view_id, page_number, total_pages)
+        if image_url is None:
+            return None
+        
+        try:
+            with metrics.span('image_download', page=page_number):
+                filepath, size, sha256 = self._fetch_image(image_url, output_dir, page_number)
         except requests.exceptions.RequestException as e:
             print(f"❌ Error downloading image for page {page_number}: {e}")
             raise
+        self._record_page(output_dir, page_number, filepath, image_url, size, sha256)
+        return filepath
 
-    def download_document_images(self, document_id, view_id, start_page=1, end_page=None, output_dir='downloaded_images'):
-        """Download images from a DocSend document"""
-        print(f"🔍 Starting download for document {document_id}")
-        print(f"📁 Output directory: {output_dir}")
+    def _resolve_end_page(self, document_id, view_id, end_page, discover=True):
+        if end_page is None and discover:
+            end_page = self.get_page_count(document_id, view_id)
+            if end_page:
+                print(f"📊 Document has {end_page} pages")
+            else:
+                print("⚠️  Could not determine page count - downloading until the last page")
+        return end_page
+
+    def _iter_pages(self, fetch, start_page, end_page, workers, available=None, discard=None, failures=None):
+        """
+        Run fetch(page) for each page on a worker pool and yield results in page order
         
-        downloaded_count = 0
-        page = start_page
+        Up to `workers` pages are in flight and at most 2 x workers finished pages wait
+        to be handed out, so memory stays bounded however slow the consumer is. Without
+        end_page, a page for which fetch returns None ends the document; with end_page,
+        such a page is recorded as failed and the rest of the range is still fetched.
+        Pages that fail after retries are recorded in self.failed_pages and skipped; an
+        authentication failure stops scheduling new pages.
         
-        while True:
-            if end_page and page > end_page:
-                break
-                
-            print(f"📄 Processing page {page}...")
-            page_data = self.get_page_data(document_id, view_id, page)
+        Args:
+            fetch (callable): Returns a page's result, or None if the page does not exist
+            start_page (int): First page
+            end_page (int): Last page, or None to run until fetch returns None
+            workers (int): Pages fetched concurrently
+            available (dict): page number -> result for pages that need no fetching
+            discard (callable): Called with (page, result) for pages fetched in this run
+                that turned out to lie past the last page (never for available pages)
+            failures (dict): Also receives this run's failed pages (page -> error)
             
-            if not page_data:
-                print(f"❌ No data found for page {page} - stopping download")
-                break
+        Yields:
+            tuple: (page number, result)
+        """
+        available = available or {}
+        ready = {}  # finished pages waiting to be yielded in order
+        failed = {}  # page number -> error message
+        state = {'stop_page': None, 'auth_failed': False}  # stop_page: first page without data
+        next_page = next_yield = start_page
+        in_flight = {}
+        
+        def can_schedule():
+            return (state['stop_page'] is None and not state['auth_failed']
+                    and not (end_page and next_page > end_page))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # Keep the pool full until we run past the end of the document
+                while can_schedule() and len(in_flight) < workers and len(ready) < 2 * workers:
+                    if next_page in available:
+                        ready[next_page] = available[next_page]
+                    else:
+                        in_flight[executor.submit(fetch, next_page)] = next_page
+                    next_page += 1
+                
+                # Hand finished pages back in page order
+                while next_yield in ready or next_yield in failed:
+                    if next_yield in ready:
+                        yield next_yield, ready.pop(next_yield)
+                    next_yield += 1
                 
-            if 'imageUrl' in page_data:
-                image_url = page_data['imageUrl']
-                try:
-                    result = self.download_image(image_url, output_dir, page)
-                    if result:
-                        downloaded_count += 1
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ No data found for page {page} - stopping download")
+                if not in_flight:
+                    if can_schedule():
+                        continue
                     break
-            else:
-                print(f"❌ No image URL found for page {page} - stopping download")
-                break
                 
-            page += 1
-            time.sleep(0.5)  # Small delay to be respectful to the server
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except AuthenticationError as e:
+                        if not state['auth_failed']:
+                            print(f"❌ {e.response.status_code} - Authentication required!")
+                            print("💡 Please provide fresh cookies from your browser session.")
+                            print("   See instructions in the README for how to get cookies.")
+                        state['auth_failed'] = True
+                        failed[page] = str(e)
+                        get_metrics().increment('pages_failed_total', reason='auth')
+                        continue
+                    except requests.exceptions.RequestException as e:
+                        print(f"❌ Page {page} failed after {self.max_retries} retries - skipping: {e}")
+                        failed[page] = str(e)
+                        get_metrics().increment('pages_failed_total', reason='request')
+                        continue
+                    if result is not None:
+                        ready[page] = result
+                    elif end_page:
+                        # The page count says this page exists, so it is missing, not the end
+                        print(f"❌ Page {page} has no image - skipping")
+                        failed[page] = "No image data"
+                        get_metrics().increment('pages_failed_total', reason='missing')
+                    elif state['stop_page'] is None or page < state['stop_page']:
+                        state['stop_page'] = page
+        
+        # Pages fetched past the stopping point would not exist in a sequential run
+        stop_page = state['stop_page']
+        if stop_page is not None:
+            failed = {p: e for p, e in failed.items() if p < stop_page}
+        if discard:
+            for page, result in ready.items():
+                if page not in available:  # Verified pages from an earlier run are kept
+                    discard(page, result)
+        self.failed_pages = dict(sorted(failed.items()))
+        if failures is not None:
+            failures.update(self.failed_pages)
+
+    def _print_summary(self, downloaded_count, resumed_count=0, stats_before=None):
+        if resumed_count:
+            print(f"🎉 Download complete! Downloaded {downloaded_count - resumed_count} pages "
+                  f"({resumed_count} already on disk).")
+        else:
+            print(f"🎉 Download complete! Downloaded {downloaded_count} pages.")
+        stats = self.connection_stats(since=stats_before)  # This run only, not the session's lifetime
+        if stats['requests']:
+            print(f"🔌 {stats['requests']} requests over {stats['connections']} connections "
+                  f"({stats['reused']} reused)")
+        if self.failed_pages:
+            missing = ', '.join(str(p) for p in self.failed_pages)
+            print(f"⚠️  {len(self.failed_pages)} pages could not be downloaded: {missing}")
+            print("💡 Run again to fetch only the missing pages.")
+
+    def _discard_saved_page(self, output_dir, page, filepath):
+        os.remove(filepath)
+        with self._manifest_lock:
+            self._manifests[output_dir]['pages'].pop(str(page), None)
+
+    def _finish_manifest(self, output_dir, save):
+        with self._manifest_lock:
+            manifest = self._manifests.pop(output_dir, None)
+            if manifest and save:
+                save_manifest(output_dir, manifest)
+
+    def download_document_images(self, document_id, view_id, start_page=1, end_page=None,
+                                 output_dir='downloaded_images', max_workers=None, resume=True, failures=None,
+                                 discover_page_count=True):
+        """
+        Download images from a DocSend document
+        
+        Pages are fetched by a pool of worker threads sharing this downloader's session.
+        Up to max_workers pages are in flight at once. When end_page is not given the
+        page count is discovered up front; if that fails, the first page without data
+        marks the end of the document and no further pages are scheduled.
+        
+        A page that still fails after retries is recorded in self.failed_pages and
+        skipped; only an authentication failure stops the whole run.
+        
+        Every finished page is recorded in output_dir/manifest.json. With resume=True,
+        pages whose files still match the manifest are not downloaded again.
         
-        print(f"🎉 Download complete! Downloaded {downloaded_count} pages.")
-        return downloaded_count
+        Args:
+            document_id (str): DocSend document ID
+            view_id (str): DocSend view ID
+            start_page (int): First page to download
+            end_page (int): Last page to download (None = discover the page count)
+            output_dir (str): Directory for page_NNN.jpg files
+            max_workers (int): Override the downloader's concurrency for this run
+            resume (bool): Reuse pages already recorded in the manifest
+            failures (dict): Filled with this run's failed pages (page -> error). Use it
+                instead of self.failed_pages when several runs share a downloader.
+            discover_page_count (bool): Look up the page count when end_page is None; pass
+                False if get_page_count was already tried and returned None
+            
+        Returns:
+            int: Number of pages available in output_dir, including resumed ones
+        """
+        workers = max(1, int(max_workers or self.max_workers))
+        print(f"🔍 Starting download for document {document_id}")
+        print(f"📁 Output directory: {output_dir}")
+        if workers > 1:
+            print(f"⚡ Fetching up to {workers} pages concurrently")
+        stats_before = self.connection_stats()
+        
+        end_page = self._resolve_end_page(document_id, view_id, end_page, discover_page_count)
+        
+        existing = {}
+        if resume:
+            existing = self._load_resumable_pages(document_id, view_id, output_dir)
+            if existing:
+                print(f"♻️  Resuming: {len(existing)} pages already downloaded")
+        else:
+            with self._manifest_lock:
+                self._manifests[output_dir] = new_manifest(document_id, view_id)
+        
+        downloaded = dict(self._iter_pages(
+            lambda page: self.download_page(document_id, view_id, page, output_dir, end_page),
+            start_page, end_page, workers,
+            available=existing,
+            discard=lambda page, filepath: self._discard_saved_page(output_dir, page, filepath),
+            failures=failures
+        ))
+        self._finish_manifest(output_dir, save=bool(downloaded))
+        
+        resumed_count = len([p for p in downloaded if p in existing])
+        self._print_summary(len(downloaded), resumed_count, stats_before)
+        return len(downloaded)
+
+    def iter_page_images(self, document_id, view_id, start_page=1, end_page=None,
+                         max_workers=None, save_dir=None, resume=True, discover_page_count=True):
+        """
+        Download a document and yield its page images as bytes, in page order
+        
+        Feeds the PDF/OCR stage directly without writing intermediate files. Pages are
+        fetched concurrently exactly like download_document_images, with at most a few
+        pages per worker held in memory.
+        
+        Args:
+            document_id (str): DocSend document ID
+            view_id (str): DocSend view ID
+            start_page (int): First page to download
+            end_page (int): Last page to download (None = discover the page count)
+            max_workers (int): Override the downloader's concurrency for this run
+            save_dir (str): Also save page_NNN.jpg files and a manifest here (optional)
+            resume (bool): Skip pages already recorded in save_dir's manifest
+            discover_page_count (bool): Look up the page count when end_page is None; pass
+                False if get_page_count was already tried and returned None
+            
+        Yields:
+            tuple: (page number, image bytes) - or the file path for resumed pages
+        """
+        workers = max(1, int(max_workers or self.max_workers))
+        print(f"🔍 Starting in-memory download for document {document_id}")
+        stats_before = self.connection_stats()
+        end_page = self._resolve_end_page(document_id, view_id, end_page, discover_page_count)
+        
+        def fetch(page):
+            metrics = get_metrics()
+            with metrics.span('page_data', page=page):
+                image_url = self._fetch_image_url(document_id, view_id, page, end_page)
+            if image_url is None:
+                return None
+            with metrics.span('image_download', page=page):
+                data = self._fetch_image_bytes(image_url, page)
+            if save_dir:
+                with metrics.span('image_save', page=page):
+                    self._save_image_bytes(data, image_url, save_dir, page)
+            return data
+        
+        existing = {}
+        discard = None
+        if save_dir:
+            if resume:
+                existing = self._load_resumable_pages(document_id, view_id, save_dir)
+                if existing:
+                    print(f"♻️  Resuming: {len(existing)} pages already downloaded")
+            else:
+                with self._manifest_lock:
+                    self._manifests[save_dir] = new_manifest(document_id, view_id)
+            discard = lambda page, data: self._discard_saved_page(
+                save_dir, page, os.path.join(save_dir, f'page_{page:03d}.jpg'))
+        
+        count = resumed_count = 0
+        try:
+            for page, data in self._iter_pages(fetch, start_page, end_page, workers,
+                                               available=existing, discard=discard):
+                count += 1
+                resumed_count += page in existing
+                yield page, data
+        finally:
+            if save_dir:
+                self._finish_manifest(save_dir, save=count > 0)
+        self._print_summary(count, resumed_count, stats_before)
 
 def get_cookies_from_browser():
     """
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Long-running conversion service with a persistent job queue.
+
+Instead of paying for a fresh process per document (imports, TLS connections,
+OCR worker start-up and, with tesserocr, model loading), the service keeps
+everything warm and takes jobs over a small HTTP API on localhost. Every
+request except GET /health needs the token the service was started with, as
+"Authorization: Bearer <token>", and POST bodies must be application/json:
+
+    POST /jobs        {"url": "...", "name": "...", "cookies": "team", "language": "eng", ...}
+                      -> 202 {"id": 12, "status": "queued"}
+    GET  /jobs        the most recent jobs
+    GET  /jobs/{id}   one job, with its live status while it runs and its report when done
+    GET  /health      queue length and uptime
+    GET  /metrics     Prometheus metrics (when started with --metrics)
+
+Jobs take the same fields as batch_runner.py manifests. Cookie set names refer
+to the file given with --cookies (a JSON object of name -> cookie dictionary or
+cookie file path); a job can also carry a cookie dictionary directly, but
+cannot name a cookie file of its own. Job names must be plain file names.
+
+Jobs are stored in SQLite before they are accepted, so jobs that were queued
+or running when the service stopped are run again when it restarts. The work
+itself is done by a BatchRunner that lives as long as the service: downloaders
+(and their sessions and connection pools) are kept per cookie set, and OCR runs
+on one long-lived process pool (compile_to_pdf.start_ocr_pool).
+
+Usage:
+    DOCSEND_SERVICE_TOKEN=... python docsend_service.py [--port 8766] [--cookies cookie_sets.json] [--metrics]
+"""
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch_runner import JOB_DEFAULTS, RUNNER_DEFAULTS, BatchRunner, check_job_name
+from metrics import Metrics, get_metrics, set_metrics
+
+DEFAULT_DB_PATH = '.docsend_service.db'
+FINISHED_STATUSES = ('ok', 'failed')
+
+
+class JobStore:
+    """SQLite table of submitted jobs; safe to use from several threads"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    spec TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    report TEXT,
+                    submitted_at REAL NOT NULL,
+                    finished_at REAL
+                )''')
+
+    @staticmethod
+    def _row(row):
+        return {
+            'id': row['id'],
+            'name': json.loads(row['spec'])['name'],
+            'status': row['status'],
+            'report': json.loads(row['report']) if row['report'] else None,
+            'submitted_at': row['submitted_at'],
+            'finished_at': row['finished_at'],
+        }
+
+    def add(self, spec):
+        """Store a new queued job; returns its id"""
+        with self._lock, self._db:
+            cursor = self._db.execute('INSERT INTO jobs (spec, status, submitted_at) VALUES (?, ?, ?)',
+                                      (json.dumps(spec), 'queued', time.time()))
+            return cursor.lastrowid
+
+    def finish(self, job_id, report):
+        with self._lock, self._db:
+            self._db.execute('UPDATE jobs SET status = ?, report = ?, finished_at = ? WHERE id = ?',
+                             (report['status'], json.dumps(report), time.time(), job_id))
+
+    def unfinished(self):
+        """(id, spec) of jobs that never finished, oldest first"""
+        with self._lock:
+            rows = self._db.execute('SELECT id, spec FROM jobs WHERE status NOT IN (?, ?) ORDER BY id',
+                                    FINISHED_STATUSES).fetchall()
+        return [(row['id'], json.loads(row['spec'])) for row in rows]
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def recent(self, limit=50):
+        with self._lock:
+            rows = self._db.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class DocSendService:
+    """Job queue in front of a long-lived BatchRunner and OCR process pool"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, cookie_sets=None, warm_ocr_workers=True, **runner_settings):
+        """
+        Args:
+            db_path (str): SQLite file the queue is kept in
+            cookie_sets (dict): Name -> cookie dictionary or cookie file path
+            warm_ocr_workers (bool): Keep one OCR process pool running for all jobs
+            **runner_settings: BatchRunner settings (max_requests, ocr_workers, ...)
+        """
+        self.store = JobStore(db_path)
+        # Jobs come over the network, so they may only use the operator's cookie sets
+        self.runner = BatchRunner(cookie_sets=cookie_sets, allow_cookie_files=False,
+                                  shared_ocr_pool=warm_ocr_workers, **runner_settings)
+        self.started_at = time.time()
+        self._running = {}  # job id -> future from BatchRunner.submit
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+
+    def submit(self, spec):
+        """
+        Validate, store and queue a job
+
+        Returns:
+            int: Job id
+
+        Raises:
+            ValueError: If the job has no url, an invalid name, unknown fields, cookies
+                that are neither a known cookie set nor a cookie dictionary, or the name
+                of a job that is still queued or running
+        """
+        if not spec.get('url') or not spec.get('name'):
+            raise ValueError("A job needs a url and a name")
+        check_job_name(spec['name'])
+        unknown = set(spec) - set(JOB_DEFAULTS) - {'url', 'name', 'cookies'}
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        cookies = spec.get('cookies')
+        if cookies is not None and not isinstance(cookies, dict) and not (
+                isinstance(cookies, str) and cookies in self.runner.cookie_sets):
+            available = ', '.join(self.runner.cookie_sets) or 'none'
+            raise ValueError(f"Unknown cookie set {cookies!r} (available: {available})")
+        with self._submit_lock:
+            if self.runner.name_in_use(spec['name']):
+                raise ValueError(f"A job named {spec['name']!r} is already queued or running")
+            job_id = self.store.add(spec)
+            self._dispatch(job_id, spec)
+        return job_id
+
+    def _dispatch(self, job_id, spec):
+        future = self.runner.submit(spec)
+        with self._lock:
+            self._running[job_id] = future
+
+        def finished(future):
+            report = future.result()
+            self.store.finish(job_id, report)
+            with self._lock:
+                self._running.pop(job_id, None)
+            print(f"{'✅' if report['status'] == 'ok' else '❌'} Job {job_id} ({spec['name']}): {report['status']}")
+
+        future.add_done_callback(finished)
+
+    def resume(self):
+        """Queue the jobs left unfinished by a previous run; returns how many"""
+        jobs = self.store.unfinished()
+        for job_id, spec in jobs:
+            try:
+                self._dispatch(job_id, spec)
+            except ValueError as e:  # Same name as a job resumed before it
+                self.store.finish(job_id, dict(status='failed', name=spec['name'], error=str(e)))
+        return len(jobs)
+
+    def job(self, job_id):
+        """A stored job, with the live report while it is running"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            future = self._running.get(job_id)
+        if future is not None:
+            job['status'] = future.report['status']
+            job['report'] = dict(future.report)
+        return job
+
+    def health(self):
+        with self._lock:
+            active = [future.report['status'] for future in self._running.values()]
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'queued': active.count('queued'),
+            'running': len(active) - active.count('queued'),
+        }
+
+    def close(self):
+        """Stop taking work; jobs that haven't started stay queued for the next start"""
+        self.runner.close(cancel_pending=True)
+        self.store.close()
+
+
+def make_handler(service, token):
+    """
+    Request handler class for a service
+
+    Args:
+        service (DocSendService): Service the requests go to
+        token (str): Bearer token every request except GET /health must carry
+    """
+    if not token:
+        raise ValueError("The service needs a token")
+    expected = f"Bearer {token}".encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _authorized(self):
+            if hmac.compare_digest(self.headers.get('Authorization', '').encode('utf-8'), expected):
+                return True
+            body = b'{"error": "missing or wrong token"}'
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Bearer')
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return False
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, indent=2).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].rstrip('/')
+            if path == '/health':
+                self._send_json(200, service.health())
+                return
+            if not self._authorized():
+                return
+            if path == '/jobs':
+                self._send_json(200, service.store.recent())
+            elif path.startswith('/jobs/') and path[len('/jobs/'):].isdigit():
+                job = service.job(int(path[len('/jobs/'):]))
+                self._send_json(200 if job else 404, job or {'error': 'no such job'})
+            elif path == '/metrics' and get_metrics().enabled:
+                body = get_metrics().prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            if self.path.rstrip('/') != '/jobs':
+                self._send_json(404, {'error': 'not found'})
+                return
+            if self.headers.get_content_type() != 'application/json':
+                self._send_json(415, {'error': 'expected Content-Type: application/json'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                spec = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(spec, dict):
+                    raise ValueError("Expected a JSON object")
+                job_id = service.submit(spec)
+            except ValueError as e:  # Includes malformed JSON
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(202, {'id': job_id, 'status': 'queued'})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (keep it local)')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite file for the job queue')
+    parser.add_argument('--cookies', help='JSON file of cookie sets: name -> cookies or cookie file path')
+    parser.add_argument('--metrics', action='store_true', help='Collect metrics and serve them on /metrics')
+    parser.add_argument('--token', default=os.environ.get('DOCSEND_SERVICE_TOKEN'),
+                        help='Bearer token clients must send (default: $DOCSEND_SERVICE_TOKEN, '
+                             'or a random one printed at start)')
+    for name, default in RUNNER_DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+
+    cookie_sets = {}
+    if args.cookies:
+        with open(args.cookies) as f:
+            cookie_sets = json.load(f)
+    if args.metrics:
+        set_metrics(Metrics())
+    token = args.token
+    if not token:
+        token = secrets.token_urlsafe(32)
+        print(f"🔑 No token given - generated one for this run: {token}")
+
+    print("🚀 DocSend conversion service")
+    print("=" * 50)
+    service = DocSendService(db_path=args.db, cookie_sets=cookie_sets,
+                             **{name: getattr(args, name) for name in RUNNER_DEFAULTS})
+    resumed = service.resume()
+    if resumed:
+        print(f"♻️  Resumed {resumed} unfinished jobs")
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(service, token))
+    httpd.daemon_threads = True
+    print(f"📡 Listening on http://{args.host}:{args.port} (POST /jobs, GET /jobs/<id>, GET /health)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping - queued jobs will resume on the next start")
+    finally:
+        httpd.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
 import os
 import time
 from docsend_image_downloader import DocSendImageDownloader, get_cookies_from_browser
+from http_cache import HTTPCache
+from image_store import ImageStore
+from metrics import Metrics, get_metrics, set_metrics
+from ocr_cache import OCRCache
 
-# Import PDF compilation functions
-from compile_to_pdf import (
-    create_pdf_without_ocr,
-    create_pdf_with_tesseract_default,
-    create_pdf_with_ocrmypdf
-)
+# PDF engines are imported when selected (see pdf_engines.py)
+from compile_to_pdf import use_ocr_backend
+from pdf_engines import get_pdf_engine
 from get_cookies_helper import extract_document_info_from_url
 
 def main():
@@ -26,6 +27,9 @@ def main():
     document_id, view_id = extract_document_info_from_url(document_url)
     document_name = "202512_Klar_MBR_Monthly Business Review_Finance"  # Name for output folder
     end_page = None  # Set to None for all pages, or specify end page
+    max_workers = 4  # Pages fetched concurrently (1 = one page at a time)
+    refresh = False  # True = re-check every page for edits (unchanged pages come from the HTTP cache)
+    save_images = True  # False = stream pages straight into the PDF without writing image files
     
     # Authentication settings - ADD YOUR COOKIES HERE
     cookies = {
@@ -39,6 +43,19 @@ def main():
     use_ocr = True  # Set to True for OCR, False for simple PDF
     use_premium_ocr = False  # Set to True for OCRmyPDF (premium quality), False for Tesseract (recommended)
     language = 'eng'  # OCR language: 'eng', 'fra', 'deu', 'spa', etc.
+    pipeline_ocr = True  # Start OCR on each page as soon as it is downloaded (Tesseract only)
+    ocr_workers = os.cpu_count() or 2  # Pages OCR'd at the same time (one tesseract process each)
+    text_layer_pdf = True  # Draw Tesseract's word boxes over each image in one pass (False = merge per-page PDFs)
+    ocr_backend = 'subprocess'  # 'tesserocr' keeps Tesseract loaded in each worker (pip install tesserocr)
+    ocr_preprocess = False  # OCR a grayscale, binarized copy of each page (text_layer_pdf only; the PDF keeps the original)
+    
+    # Output size
+    output_profile = None  # None = keep the PDF as built, or 'archive', 'balanced', 'compact' (smaller, lower-DPI images)
+    compare_profiles = False  # Also write a copy per profile (name_<profile>.pdf) and print the sizes
+    
+    # Metrics (None = off)
+    metrics_jsonl = None  # e.g. 'metrics/docsend.jsonl' - per-page stage timings and counters, appended each run
+    metrics_prometheus = None  # e.g. 'metrics/docsend.prom' - for node_exporter's textfile collector
     
     # ============================================================================
     # AUTHENTICATION CHECK
@@ -50,36 +67,68 @@ def main():
         get_cookies_from_browser()
         return
     
+    if metrics_jsonl or metrics_prometheus:
+        set_metrics(Metrics(jsonl_path=metrics_jsonl, prometheus_path=metrics_prometheus))
+    
     # ============================================================================
     # STEP 1: DOWNLOAD IMAGES FROM DOCSEND
     # ============================================================================
     
     print(f"\n📥 Step 1: Downloading images from DocSend...")
     print(f"Document: {document_name}")
-    print(f"Pages: 1 to {end_page if end_page else 'end'}")
     
     # Create downloader with authentication
-    downloader = DocSendImageDownloader(cookies=cookies)
-    image_dir = f'downloaded_images/{document_name}'
-    
-    # Download images
-    downloaded_count = downloader.download_document_images(
-        document_id=document_id,
-        view_id=view_id,
-        start_page=1,
-        end_page=end_page,
-        output_dir=image_dir
-    )
-    
-    # Check if images were downloaded
-    if downloaded_count == 0:
-        print("❌ No images were downloaded. Please check:")
-        print("   1. Your document ID and view ID are correct")
-        print("   2. Your authentication cookies are fresh and valid")
-        print("   3. You have access to the document")
-        return
+    downloader = DocSendImageDownloader(cookies=cookies, max_workers=max_workers,
+                                        http_cache=HTTPCache(), image_store=ImageStore())
+    
+    # Discover the page range up front so downloads and the PDF stage can plan against it
+    if end_page is None:
+        end_page = downloader.get_page_count(document_id, view_id)
+    print(f"Pages: 1 to {end_page if end_page else 'end'}")
     
-    print(f"✅ Successfully downloaded {downloaded_count} images to {image_dir}")
+    # Tesseract can start on pages while the rest are still downloading
+    pipelined = use_ocr and not use_premium_ocr and pipeline_ocr
+    
+    if save_images and not pipelined:
+        image_dir = f'downloaded_images/{document_name}'
+        images = None
+        
+        # Download images
+        downloaded_count = downloader.download_document_images(
+            document_id=document_id,
+            view_id=view_id,
+            start_page=1,
+            end_page=end_page,
+            output_dir=image_dir,
+            resume=not refresh,
+            discover_page_count=False  # Already looked up above
+        )
+        
+        # Check if images were downloaded
+        if downloaded_count == 0:
+            print("❌ No images were downloaded. Please check:")
+            print("   1. Your document ID and view ID are correct")
+            print("   2. Your authentication cookies are fresh and valid")
+            print("   3. You have access to the document")
+            return
+        
+        print(f"✅ Successfully downloaded {downloaded_count} images to {image_dir}")
+        if downloader.failed_pages:
+            print(f"⚠️  The PDF will be missing pages: {', '.join(str(p) for p in downloader.failed_pages)}")
+    else:
+        # Pages are downloaded lazily while the PDF is built
+        image_dir = f'downloaded_images/{document_name}' if save_images else None
+        images = downloader.iter_page_images(
+            document_id=document_id,
+            view_id=view_id,
+            start_page=1,
+            end_page=end_page,
+            save_dir=image_dir,
+            resume=not refresh,
+            discover_page_count=False  # Already looked up above
+        )
+        if not save_images:
+            print("💾 Image files will not be saved - pages go straight into the PDF")
     
     # ============================================================================
     # STEP 2: CREATE SEARCHABLE PDF
@@ -87,28 +136,67 @@ def main():
     
     print(f"\n📄 Step 2: Creating searchable PDF...")
     
+    # OCR results are cached by image content, language and Tesseract config
+    ocr_cache = OCRCache()
+    use_ocr_backend(ocr_backend)
+    preprocess = None
+    if ocr_preprocess:
+        from ocr_preprocess import OCRPreprocessor
+        preprocess = OCRPreprocessor()
+    
     # Determine output filename based on settings
     if use_ocr:
         if use_premium_ocr:
             output_pdf = f'pdf_documents/{document_name}_premium.pdf'
             print("🔍 Creating PREMIUM searchable PDF with OCRmyPDF...")
-            success = create_pdf_with_ocrmypdf(image_dir, output_pdf, language, high_quality_mode=True)
+            success = get_pdf_engine('ocrmypdf')(image_dir, output_pdf, language, high_quality_mode=True,
+                                                         images=images, ocr_cache=ocr_cache, jobs=ocr_workers)
+        elif pipelined:
+            output_pdf = f'pdf_documents/{document_name}.pdf'
+            print(f"🔍 Creating searchable PDF with Tesseract while downloading ({ocr_workers} OCR workers)...")
+            success = get_pdf_engine('pipelined')(image_dir, output_pdf, language, images=images,
+                                                  ocr_workers=ocr_workers, ocr_cache=ocr_cache,
+                                                  text_layer=text_layer_pdf, preprocess=preprocess)
         else:
             output_pdf = f'pdf_documents/{document_name}.pdf'
             print("🔍 Creating searchable PDF with Tesseract (RECOMMENDED)...")
-            success = create_pdf_with_tesseract_default(image_dir, output_pdf, language)
+            success = get_pdf_engine('tesseract')(image_dir, output_pdf, language, images=images,
+                                                  workers=ocr_workers, ocr_cache=ocr_cache,
+                                                  text_layer=text_layer_pdf, preprocess=preprocess)
     else:
         output_pdf = f'pdf_documents/{document_name}.pdf'
         print("📄 Creating simple PDF without OCR...")
-        success = create_pdf_without_ocr(image_dir, output_pdf)
+        success = get_pdf_engine('image-only')(image_dir, output_pdf, images=images)
     
     # ============================================================================
     # RESULTS
     # ============================================================================
     
+    metrics = get_metrics()
+    if success and (output_profile or compare_profiles):
+        from output_profiles import apply_output_profile, compare_output_profiles, describe_result
+    if success and output_profile:
+        print(f"\n📦 Applying the '{output_profile}' output profile...")
+        with metrics.span('output_profile'):
+            result = apply_output_profile(output_pdf, profile=output_profile, workers=ocr_workers)
+        if result:
+            print(f"📦 {describe_result(result)}")
+    if success and compare_profiles:
+        print("\n📦 Comparing output profiles...")
+        compare_output_profiles(output_pdf, workers=ocr_workers)
+    
+    # Exported once every stage, including the output profile, has been timed
+    if metrics.enabled:
+        print(f"\n⏱️  {metrics.summary()}")
+        metrics.export()
+        metrics.close()
+    
     if success:
         print(f"\n🎉 SUCCESS! Complete workflow finished.")
-        print(f"📁 Images: {image_dir}")
+        if image_dir:
+            print(f"📁 Images: {image_dir}")
+        if downloader.failed_pages:
+            print(f"⚠️  Missing pages: {', '.join(str(p) for p in downloader.failed_pages)}")
         print(f"📄 PDF: {output_pdf}")
         
         # Show file size
@@ -0,0 +1,103 @@
+"""
+Per-document download manifest kept next to the page images.
+
+The manifest records, for every downloaded page, the file name, source URL,
+byte size, SHA-256 checksum and download time. Reruns use it to skip pages
+that are already on disk and intact, and the PDF stage uses it as the
+authoritative page list.
+"""
+
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def new_manifest(document_id=None, view_id=None):
+    return {'document_id': document_id, 'view_id': view_id, 'pages': {}}
+
+
+def load_manifest(image_dir):
+    """
+    Load the manifest from an image directory
+    
+    Returns:
+        dict: The manifest, or None if there is none or it cannot be read
+    """
+    path = os.path.join(image_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        print(f"⚠️  Ignoring unreadable manifest: {path}")
+        return None
+    if not isinstance(manifest.get('pages'), dict):
+        return None
+    return manifest
+
+
+def save_manifest(image_dir, manifest):
+    """Write the manifest atomically so an interrupted run never leaves it half-written"""
+    os.makedirs(image_dir, exist_ok=True)
+    path = os.path.join(image_dir, MANIFEST_FILENAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def make_page_entry(filename, url, size, sha256):
+    return {
+        'file': filename,
+        'url': url,
+        'bytes': size,
+        'sha256': sha256,
+        'downloaded_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def verify_page(image_dir, entry):
+    """Check that a page file exists and matches its manifest size and checksum"""
+    path = os.path.join(image_dir, entry['file'])
+    try:
+        if os.path.getsize(path) != entry['bytes']:
+            return False
+    except OSError:
+        return False
+    return file_checksum(path) == entry['sha256']
+
+
+def get_image_files(image_dir):
+    """
+    List page images in page order
+    
+    Uses the manifest when there is one, so only pages recorded as fully
+    downloaded are included. Directories without a manifest fall back to
+    globbing page_*.jpg.
+    
+    Returns:
+        list: Image file paths sorted by page number
+    """
+    manifest = load_manifest(image_dir)
+    if manifest:
+        pages = sorted(manifest['pages'].items(), key=lambda item: int(item[0]))
+        image_files = [os.path.join(image_dir, entry['file']) for _, entry in pages]
+        return [path for path in image_files if os.path.exists(path)]
+    
+    image_files = glob.glob(os.path.join(image_dir, 'page_*.jpg'))
+    image_files.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
+    return image_files
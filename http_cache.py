@@ -0,0 +1,155 @@
+"""
+On-disk HTTP cache with conditional requests for DocSend page data and images.
+
+Responses that carry an ETag or Last-Modified header are stored with their
+validators. Later requests for the same resource send If-None-Match /
+If-Modified-Since, and a 304 Not Modified is answered from disk, so repeat
+runs only transfer pages that actually changed.
+
+Entries are keyed by URL without its query string: page_data requests carry
+a fresh viewLoadTime on every call and image URLs carry short-lived
+signatures, neither of which identifies the content.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_CACHE_DIR = '.http_cache'
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+
+class HTTPCache:
+    """Size-limited, LRU-evicted store of response bodies and their validators"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir (str): Directory holding cached bodies and metadata
+            max_bytes (int): Total body size kept before least recently used entries are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def cache_key(url):
+        parts = urlsplit(url)
+        return hashlib.sha256(urlunsplit(parts._replace(query='', fragment='')).encode()).hexdigest()
+
+    def _paths(self, url):
+        key = self.cache_key(url)
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + '.body', base + '.json'
+
+    def _entries(self):
+        """Yield (body path, last used time, size) for every cached body"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.body'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _load_meta(self, url):
+        body_path, meta_path = self._paths(url)
+        if not os.path.exists(body_path):
+            return None
+        try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def conditional_headers(self, url):
+        """Return If-None-Match / If-Modified-Since headers for a cached URL (empty if not cached)"""
+        meta = self._load_meta(url)
+        if not meta:
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def body_path(self, url):
+        """
+        Return the cached body for a URL answered with 304 and mark it recently used
+        
+        Returns:
+            str: Path of the cached body, or None if it has been evicted meanwhile
+        """
+        body_path, _ = self._paths(url)
+        try:
+            os.utime(body_path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body_path
+
+    def read_bytes(self, url):
+        path = self.body_path(url)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def store_file(self, url, response_headers, source_path):
+        """Copy a downloaded body into the cache if the response has validators"""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+        
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        temp_path = f'{body_path}.{threading.get_ident()}.tmp'
+        shutil.copyfile(source_path, temp_path)
+        size = os.path.getsize(temp_path)
+        
+        with self._lock:
+            if os.path.exists(body_path):
+                self._total_bytes -= os.path.getsize(body_path)
+            os.replace(temp_path, body_path)
+            with open(meta_path, 'w') as f:
+                json.dump({'url': url, 'etag': etag, 'last_modified': last_modified, 'bytes': size}, f)
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return True
+
+    def store_bytes(self, url, response_headers, body):
+        """Store an in-memory body, such as a page_data JSON response"""
+        if not response_headers.get('ETag') and not response_headers.get('Last-Modified'):
+            return False
+        temp_path = os.path.join(self.cache_dir, f'incoming.{threading.get_ident()}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(body)
+        try:
+            return self.store_file(url, response_headers, temp_path)
+        finally:
+            os.remove(temp_path)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+        for body_path, _, size in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            for path in (body_path, body_path[:-len('.body')] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes -= size
@@ -0,0 +1,293 @@
+"""
+Image-only PDF writer that embeds page images without re-encoding them.
+
+In the style of img2pdf: JPEG files go into the PDF byte for byte as DCTDecode
+streams, and PNG image data (already zlib-compressed) goes in as FlateDecode
+streams with the PNG predictor, so pages keep the exact quality DocSend served
+and building a PDF costs little more than copying the files. Width, height and
+colour layout come from the file header; pixels are never decoded.
+
+Images that can't be embedded directly (interlaced or transparent PNGs, 16-bit
+PNGs, other formats) are decoded with PIL and stored losslessly instead.
+
+Each page gets its own size, computed from its pixel dimensions at `dpi`.
+Pages are written to the output as they are added, so memory use does not grow
+with the number of pages.
+"""
+
+import io
+import os
+import struct
+import zlib
+
+from PIL import Image
+
+DEFAULT_DPI = 300
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_COLOR_SPACES = {1: '/DeviceGray', 3: '/DeviceRGB', 4: '/DeviceCMYK'}
+PNG_COLORS = {0: 1, 2: 3}  # PNG colour type -> components for grey and RGB images
+
+# JPEG start-of-frame markers (baseline, extended, progressive, lossless, ...)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def read_source(source):
+    """Return the bytes of a page image given as a file path or as bytes"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def jpeg_info(data):
+    """
+    Read the size and layout of a JPEG from its start-of-frame header
+
+    Returns:
+        tuple: (width, height, components, adobe) - adobe is True if an Adobe APP14
+            marker is present (Adobe CMYK JPEGs store inverted values)
+
+    Raises:
+        ValueError: If data is not a JPEG or has no frame header
+    """
+    if data[:2] != b'\xff\xd8':
+        raise ValueError("Not a JPEG image")
+    adobe = False
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError("Corrupt JPEG marker stream")
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            pos += 2
+            continue
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker == 0xEE and data[pos + 4:pos + 9] == b'Adobe':
+            adobe = True
+        if marker in SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            return width, height, data[pos + 9], adobe
+        if marker == 0xDA:  # Start of scan before any frame header
+            break
+        pos += 2 + length
+    raise ValueError("JPEG has no frame header")
+
+
+def png_info(data):
+    """
+    Read a PNG's header and collect its image data chunks
+
+    Returns:
+        dict: width, height, bit_depth, color_type, interlace, palette (bytes or None),
+            transparent (bool) and idat (the concatenated compressed image data)
+
+    Raises:
+        ValueError: If data is not a PNG
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG image")
+    info = {'palette': None, 'transparent': False}
+    idat = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if chunk_type == b'IHDR':
+            (info['width'], info['height'], info['bit_depth'], info['color_type'],
+             _, _, info['interlace']) = struct.unpack('>IIBBBBB', body)
+        elif chunk_type == b'PLTE':
+            info['palette'] = body
+        elif chunk_type == b'tRNS':
+            info['transparent'] = True
+        elif chunk_type == b'IDAT':
+            idat.append(body)
+        elif chunk_type == b'IEND':
+            break
+        pos += 12 + length  # Length, type, body and CRC
+    if 'width' not in info:
+        raise ValueError("PNG has no IHDR chunk")
+    info['idat'] = b''.join(idat)
+    return info
+
+
+def image_size(source):
+    """(width, height) in pixels of a JPEG or PNG page, read from the header only"""
+    data = read_source(source)
+    if data.startswith(PNG_SIGNATURE):
+        info = png_info(data)
+        return info['width'], info['height']
+    width, height, _, _ = jpeg_info(data)
+    return width, height
+
+
+def _png_passthrough(info):
+    """True if the PNG's compressed data can be used as a PDF stream unchanged"""
+    if info['interlace'] or info['transparent'] or info['bit_depth'] > 8:
+        return False
+    if info['color_type'] == 3:
+        return info['palette'] is not None
+    return info['color_type'] in PNG_COLORS
+
+
+def image_xobject(data):
+    """
+    Build the dictionary entries and stream for an image XObject
+
+    Returns:
+        tuple: (width, height, dictionary body as str, stream bytes)
+    """
+    if data[:2] == b'\xff\xd8':
+        width, height, components, adobe = jpeg_info(data)
+        if components in JPEG_COLOR_SPACES:
+            entries = (f'/Width {width} /Height {height} /ColorSpace {JPEG_COLOR_SPACES[components]} '
+                       f'/BitsPerComponent 8 /Filter /DCTDecode')
+            if components == 4 and adobe:
+                entries += ' /Decode [1 0 1 0 1 0 1 0]'
+            return width, height, entries, data
+
+    elif data.startswith(PNG_SIGNATURE):
+        info = png_info(data)
+        if _png_passthrough(info):
+            width, height, bits = info['width'], info['height'], info['bit_depth']
+            if info['color_type'] == 3:
+                colors = 1
+                palette = info['palette']
+                color_space = f'[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]'
+            else:
+                colors = PNG_COLORS[info['color_type']]
+                color_space = JPEG_COLOR_SPACES[colors]
+            entries = (f'/Width {width} /Height {height} /ColorSpace {color_space} '
+                       f'/BitsPerComponent {bits} /Filter /FlateDecode '
+                       f'/DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {bits} '
+                       f'/Columns {width} >>')
+            return width, height, entries, info['idat']
+
+    # Anything else: decode once and store the pixels losslessly
+    with Image.open(io.BytesIO(data)) as img:
+        if img.mode in ('RGBA', 'LA', 'P', 'PA') or 'transparency' in img.info:
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, 'white')
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode not in ('L', 'RGB'):
+            img = img.convert('RGB')
+        width, height = img.size
+        color_space = '/DeviceGray' if img.mode == 'L' else '/DeviceRGB'
+        entries = (f'/Width {width} /Height {height} /ColorSpace {color_space} '
+                   f'/BitsPerComponent 8 /Filter /FlateDecode')
+        return width, height, entries, zlib.compress(img.tobytes())
+
+
+class ImagePDFWriter:
+    """Stream page images into an image-only PDF without re-encoding them"""
+
+    PAGES_OBJECT = 2  # Reserved so pages can point at their parent before it is written
+
+    def __init__(self, output_pdf, dpi=DEFAULT_DPI):
+        """
+        Args:
+            output_pdf (str): Output PDF path (or a writable binary file object)
+            dpi (int): Resolution the page images are assumed to have
+        """
+        self.output_pdf = output_pdf
+        self.scale = 72.0 / dpi
+        self.page_count = 0
+        self._file = None
+        self._offsets = {}
+        self._pages = []
+        self._next_object = 3
+
+    def _start(self):
+        if isinstance(self.output_pdf, str):
+            os.makedirs(os.path.dirname(self.output_pdf) or '.', exist_ok=True)
+            self._file = open(self.output_pdf, 'wb')
+        else:
+            self._file = self.output_pdf
+        self._position = 0
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def _write_object(self, number, body, stream=None):
+        self._offsets[number] = self._position
+        if stream is None:
+            self._write(f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1'))
+            return
+        self._write(f'{number} 0 obj\n<< {body} /Length {len(stream)} >>\nstream\n'.encode('latin-1'))
+        self._write(stream)
+        self._write(b'\nendstream\nendobj\n')
+
+    def _allocate(self):
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def add_page(self, source):
+        """
+        Append one page, sized to the image
+
+        Args:
+            source: Page image (JPEG or PNG; other formats are converted) as a file path or bytes
+        """
+        width, height, entries, stream = image_xobject(read_source(source))
+        if self._file is None:
+            self._start()
+
+        page_width = width * self.scale
+        page_height = height * self.scale
+        image_number, content_number, page_number = self._allocate(), self._allocate(), self._allocate()
+
+        self._write_object(image_number, f'/Type /XObject /Subtype /Image {entries}', stream)
+        content = f'q {page_width:.4f} 0 0 {page_height:.4f} 0 0 cm /Im0 Do Q'.encode('latin-1')
+        self._write_object(content_number, '', content)
+        self._write_object(page_number,
+                           f'<< /Type /Page /Parent {self.PAGES_OBJECT} 0 R '
+                           f'/MediaBox [0 0 {page_width:.4f} {page_height:.4f}] '
+                           f'/Resources << /XObject << /Im0 {image_number} 0 R >> >> '
+                           f'/Contents {content_number} 0 R >>')
+        self._pages.append(page_number)
+        self.page_count += 1
+
+    def save(self):
+        """
+        Write the page tree, cross-reference table and trailer
+
+        Returns:
+            bool: False if no pages were added (nothing is written)
+        """
+        if self._file is None:
+            return False
+
+        kids = ' '.join(f'{number} 0 R' for number in self._pages)
+        self._write_object(self.PAGES_OBJECT, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>')
+        self._write_object(1, f'<< /Type /Catalog /Pages {self.PAGES_OBJECT} 0 R >>')
+
+        xref_offset = self._position
+        lines = [f'xref\n0 {self._next_object}\n', '0000000000 65535 f \n']
+        lines += [f'{self._offsets[number]:010d} 00000 n \n' for number in range(1, self._next_object)]
+        lines.append(f'trailer\n<< /Size {self._next_object} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n')
+        self._write(''.join(lines).encode('latin-1'))
+
+        if isinstance(self.output_pdf, str):
+            self._file.close()
+        self._file = None
+        return True
+
+
+def write_image_pdf(sources, output_pdf, dpi=DEFAULT_DPI):
+    """
+    Write page images to an image-only PDF
+
+    Returns:
+        int: Number of pages written (0 if there were no images - no file is created)
+    """
+    writer = ImagePDFWriter(output_pdf, dpi)
+    for source in sources:
+        writer.add_page(source)
+    writer.save()
+    return writer.page_count
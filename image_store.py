@@ -0,0 +1,69 @@
+"""
+Content-addressed store for slide images shared across documents.
+
+Each distinct image is kept once under image_store/<aa>/<sha256>.jpg. The
+page_NNN.jpg files in each document folder are links to those blobs (hard
+links where possible, then symlinks, then plain copies), so slides repeated
+across decks take no extra space. Downstream results such as OCR can be keyed
+by the same SHA-256 recorded in each folder's manifest.
+"""
+
+import os
+import shutil
+import threading
+
+DEFAULT_STORE_DIR = 'image_store'
+
+
+class ImageStore:
+    """Deduplicating blob store keyed by image SHA-256"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        """
+        Args:
+            root (str): Directory holding the blobs
+        """
+        self.root = root
+        self.added = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def blob_path(self, sha256, extension='.jpg'):
+        return os.path.join(self.root, sha256[:2], sha256 + extension)
+
+    def contains(self, sha256, extension='.jpg'):
+        return os.path.exists(self.blob_path(sha256, extension))
+
+    def add_file(self, path, sha256, extension='.jpg'):
+        """
+        Move a freshly downloaded file into the store
+        
+        If a blob with the same hash already exists the file is discarded instead.
+        
+        Returns:
+            str: Path of the blob
+        """
+        blob = self.blob_path(sha256, extension)
+        with self._lock:
+            if os.path.exists(blob):
+                os.remove(path)
+                self.deduplicated += 1
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                shutil.move(path, blob)
+                self.added += 1
+        return blob
+
+    def link(self, blob, destination):
+        """Point destination at a blob, replacing any existing file atomically"""
+        temp_path = f'{destination}.{threading.get_ident()}.link'
+        try:
+            os.link(blob, temp_path)
+        except OSError:
+            try:
+                os.symlink(os.path.abspath(blob), temp_path)
+            except OSError:
+                shutil.copyfile(blob, temp_path)
+        os.replace(temp_path, destination)
+        return destination
@@ -0,0 +1,292 @@
+"""
+Counters, histograms and per-page stage spans for downloads and PDF builds.
+
+Code reports what it does through the process-wide metrics object:
+
+    metrics = get_metrics()
+    metrics.increment('http_bytes_total', len(data), kind='image')
+    with metrics.span('ocr', page=3):
+        ...
+
+By default that object is a NullMetrics, whose methods do nothing, so
+instrumented code costs a few no-op calls when nobody is collecting. Install a
+Metrics with set_metrics() to collect:
+
+- every span adds its duration to the stage_seconds histogram (labelled by
+  stage) and, with a JSON-lines file configured, is appended to it as one event
+  with its page number
+- export() writes the counters and histograms to the JSON-lines file and/or a
+  Prometheus text file (for node_exporter's textfile collector)
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_PREFIX = 'docsend_'
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _prometheus_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _Span:
+    """Times a block of code and reports it to Metrics.record_span"""
+
+    __slots__ = ('metrics', 'stage', 'page', 'labels', 'started')
+
+    def __init__(self, metrics, stage, page, labels):
+        self.metrics = metrics
+        self.stage = stage
+        self.page = page
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = exc_type.__name__ if exc_type is not None else None
+        self.metrics.record_span(self.stage, time.perf_counter() - self.started, self.page, error, **self.labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullMetrics:
+    """Metrics interface that records nothing - the default"""
+
+    enabled = False
+
+    def increment(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def span(self, stage, page=None, **labels):
+        return _NULL_SPAN
+
+    def record_span(self, stage, seconds, page=None, error=None, **labels):
+        pass
+
+    def export(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Metrics:
+    """Thread-safe in-memory counters and histograms, with span events streamed to JSON lines"""
+
+    enabled = True
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            jsonl_path (str): File that span events and export() snapshots are appended to (optional)
+            prometheus_path (str): File export() writes in Prometheus text format (optional)
+            buckets (tuple): Histogram bucket upper bounds
+        """
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.buckets = tuple(buckets)
+        self._counters = {}  # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: [bucket counts..., sum, count]}
+        self._lock = threading.Lock()
+        self._events = None
+
+    def increment(self, name, value=1, **labels):
+        """Add to a counter, e.g. increment('http_retries_total', kind='image', reason='429')"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record a value (usually seconds) in a histogram"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[n] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def span(self, stage, page=None, **labels):
+        """Context manager that times one stage, optionally for one page"""
+        return _Span(self, stage, page, labels)
+
+    def record_span(self, stage, seconds, page=None, error=None, **labels):
+        """
+        Record a stage duration measured elsewhere (e.g. in an OCR worker process)
+
+        The histogram is labelled by stage (and labels) only; the page number
+        goes into the JSON-lines event, so series don't multiply with pages.
+        """
+        self.observe('stage_seconds', seconds, stage=stage, **labels)
+        if error:
+            self.increment('stage_errors_total', stage=stage, error=error, **labels)
+        if self.jsonl_path:
+            event = {'type': 'span', 'time': time.time(), 'stage': stage, 'seconds': round(seconds, 6)}
+            if page is not None:
+                event['page'] = page
+            if error:
+                event['error'] = error
+            event.update(labels)
+            self._write_event(event)
+
+    def _write_event(self, event):
+        line = json.dumps(event, default=str) + '\n'
+        with self._lock:
+            if self._events is None:
+                os.makedirs(os.path.dirname(self.jsonl_path) or '.', exist_ok=True)
+                self._events = open(self.jsonl_path, 'a', encoding='utf-8')
+            self._events.write(line)
+
+    def snapshot(self):
+        """
+        Current values
+
+        Returns:
+            dict: {'counters': {name: [(labels, value)]},
+                   'histograms': {name: [(labels, {'buckets': {le: count}, 'sum': s, 'count': n})]}}
+        """
+        with self._lock:
+            counters = {name: [(dict(key), value) for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = [(dict(key), {'buckets': dict(zip(self.buckets, state[:-2])),
+                                                 'sum': state[-2], 'count': state[-1]})
+                                    for key, state in series.items()]
+        return {'counters': counters, 'histograms': histograms}
+
+    def stage_totals(self):
+        """stage -> (spans, total seconds), summed over all labels"""
+        totals = {}
+        for labels, state in self.snapshot()['histograms'].get('stage_seconds', []):
+            count, seconds = totals.get(labels['stage'], (0, 0.0))
+            totals[labels['stage']] = (count + state['count'], seconds + state['sum'])
+        return totals
+
+    def summary(self):
+        """One-line time-by-stage summary; spans overlap across workers, so totals can exceed wall time"""
+        totals = self.stage_totals()
+        if not totals:
+            return "No stages recorded"
+        return "Time by stage (summed over workers): " + ', '.join(
+            f"{stage} {seconds:.1f}s/{count}" for stage, (count, seconds) in totals.items())
+
+    def write_jsonl(self, path):
+        """Append one line per counter and histogram series"""
+        now = time.time()
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in snapshot['counters'].items():
+            lines += [{'type': 'counter', 'time': now, 'name': name, 'labels': labels, 'value': value}
+                      for labels, value in series]
+        for name, series in snapshot['histograms'].items():
+            lines += [{'type': 'histogram', 'time': now, 'name': name, 'labels': labels,
+                       'buckets': {str(le): count for le, count in state['buckets'].items()},
+                       'sum': state['sum'], 'count': state['count']}
+                      for labels, state in series]
+        with self._lock:
+            if self._events is not None and os.path.abspath(path) == os.path.abspath(self.jsonl_path):
+                self._events.flush()
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                for line in lines:
+                    f.write(json.dumps(line) + '\n')
+
+    def prometheus_text(self):
+        """Counters and histograms in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [f"# Exported {datetime.now().isoformat(timespec='seconds')}"]
+        for name, series in sorted(snapshot['counters'].items()):
+            metric = PROMETHEUS_PREFIX + name
+            lines.append(f'# TYPE {metric} counter')
+            lines += [f'{metric}{_prometheus_labels(_label_key(labels))} {value}' for labels, value in series]
+        for name, series in sorted(snapshot['histograms'].items()):
+            metric = PROMETHEUS_PREFIX + name
+            lines.append(f'# TYPE {metric} histogram')
+            for labels, state in series:
+                key = _label_key(labels)
+                for le, count in state['buckets'].items():
+                    lines.append(f'{metric}_bucket{_prometheus_labels(key, [("le", le)])} {count}')
+                lines.append(f'{metric}_bucket{_prometheus_labels(key, [("le", "+Inf")])} {state["count"]}')
+                lines.append(f'{metric}_sum{_prometheus_labels(key)} {state["sum"]}')
+                lines.append(f'{metric}_count{_prometheus_labels(key)} {state["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write prometheus_text() atomically, so a collector never reads half a file"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def export(self):
+        """Write the configured JSON-lines and Prometheus outputs"""
+        if self.jsonl_path:
+            self.write_jsonl(self.jsonl_path)
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+
+    def close(self):
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+
+
+_metrics = NullMetrics()
+
+
+def get_metrics():
+    """Return the process-wide metrics object (a NullMetrics unless set_metrics was called)"""
+    return _metrics
+
+
+def set_metrics(metrics):
+    """
+    Install the process-wide metrics object
+
+    Args:
+        metrics (Metrics): Collector to use, or None to go back to NullMetrics
+
+    Returns:
+        The metrics object now in use
+    """
+    global _metrics
+    _metrics = metrics if metrics is not None else NullMetrics()
+    return _metrics
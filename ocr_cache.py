@@ -0,0 +1,114 @@
+"""
+Persistent cache of per-page OCR output.
+
+Results (the text-layer PDF Tesseract produces for a page, or its word boxes)
+are keyed by the SHA-256 of the image content together with the OCR language
+and the Tesseract config string (which also names the OCR backend), so
+rebuilding a PDF - or building the same slide in another deck - reuses earlier
+OCR instead of running it again.
+"""
+
+import hashlib
+import os
+import threading
+
+from download_manifest import file_checksum
+
+DEFAULT_CACHE_DIR = '.ocr_cache'
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB
+
+
+def image_hash(source):
+    """SHA-256 of a page image given as bytes or as a file path"""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    return file_checksum(source)
+
+
+class OCRCache:
+    """Size-limited, LRU-evicted store of OCR results"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir (str): Directory holding cached results
+            max_bytes (int): Total size kept before least recently used results are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def cache_key(digest, language, config, kind):
+        return hashlib.sha256(f'{digest}\0{language}\0{config}\0{kind}'.encode()).hexdigest()
+
+    def _path(self, key, kind):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.{kind}')
+
+    def _entries(self):
+        """Yield (path, last used time, size) for every cached result"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def get(self, digest, language, config, kind='pdf'):
+        """
+        Look up a result and mark it recently used
+        
+        Args:
+            digest (str): SHA-256 of the page image (see image_hash)
+            language (str): Tesseract language
+            config (str): Tesseract config string
+            kind (str): Result type, e.g. 'pdf' or 'tsv'
+            
+        Returns:
+            bytes: The cached result, or None
+        """
+        path = self._path(self.cache_key(digest, language, config, kind), kind)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, digest, language, config, data, kind='pdf'):
+        """Store a result, evicting least recently used results if over max_bytes"""
+        path = self._path(self.cache_key(digest, language, config, kind), kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        
+        with self._lock:
+            if os.path.exists(path):
+                self._total_bytes -= os.path.getsize(path)
+            os.replace(temp_path, path)
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used results until the cache fits in max_bytes (lock held)"""
+        for path, _, size in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total_bytes -= size
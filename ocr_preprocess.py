@@ -0,0 +1,180 @@
+"""
+Clean up page images before OCR, without touching what goes into the PDF.
+
+Slides are often large, colourful images; Tesseract reads them faster (and
+usually better) as small, high-contrast, black-on-white images. OCRPreprocessor
+produces such an OCR-only copy of each page:
+
+1. grayscale
+2. optional downscale to a target DPI
+3. contrast stretch between two histogram percentiles
+4. Otsu binarization, flipped where needed so text is dark on a light background
+
+Steps 3-4 are worked out for a whole batch of pages at once: the grey-level
+histograms of the batch form one (pages x 256) NumPy array, from which the
+percentiles, Otsu thresholds and lookup tables of every page are computed
+together. Each page then takes a single pass through its lookup table.
+
+Word boxes found on a downscaled image are mapped back to the original pixel
+size with rescale_tsv, so the text layer still lines up with the embedded image.
+"""
+
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from text_layer_pdf import DEFAULT_DPI
+
+TSV_BOX_COLUMNS = ('left', 'top', 'width', 'height')
+
+
+def otsu_thresholds(histograms):
+    """
+    Otsu threshold of each row of an (N, 256) histogram array
+
+    Returns:
+        numpy.ndarray: N thresholds - pixels above the threshold are foreground
+    """
+    probabilities = histograms / np.maximum(histograms.sum(axis=1, keepdims=True), 1)
+    levels = np.arange(256)
+    omega = np.cumsum(probabilities, axis=1)
+    mu = np.cumsum(probabilities * levels, axis=1)
+    mu_total = mu[:, -1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between_class = (mu_total * omega - mu) ** 2 / (omega * (1 - omega))
+    return np.argmax(np.nan_to_num(between_class), axis=1)
+
+
+def rescale_tsv(tsv, factor):
+    """
+    Scale the word boxes in Tesseract TSV output
+
+    Args:
+        tsv (bytes): Output of image_to_data / GetTSVText with a header row
+        factor (float): Multiplier for left, top, width and height
+
+    Returns:
+        bytes: TSV with rescaled boxes
+    """
+    lines = tsv.decode('utf-8').split('\n')
+    columns = lines[0].split('\t')
+    box_columns = [columns.index(name) for name in TSV_BOX_COLUMNS if name in columns]
+    for n, line in enumerate(lines[1:], 1):
+        fields = line.split('\t')
+        if len(fields) < len(columns):
+            continue
+        for column in box_columns:
+            fields[column] = str(round(int(fields[column]) * factor))
+        lines[n] = '\t'.join(fields)
+    return '\n'.join(lines).encode('utf-8')
+
+
+class OCRPreprocessor:
+    """Turn page images into OCR-only grayscale/binary images, a batch at a time"""
+
+    def __init__(self, target_dpi=None, source_dpi=DEFAULT_DPI, contrast=True, binarize=True,
+                 low_percentile=1.0, high_percentile=99.0, batch_size=8):
+        """
+        Args:
+            target_dpi (int): Downscale pages above this resolution (None keeps the size)
+            source_dpi (int): Resolution the page images are assumed to have
+            contrast (bool): Stretch grey levels between low_percentile and high_percentile
+            binarize (bool): Reduce pages to black and white with Otsu's threshold
+            low_percentile (float): Grey level percentile mapped to black
+            high_percentile (float): Grey level percentile mapped to white
+            batch_size (int): Pages processed together
+        """
+        self.target_dpi = target_dpi
+        self.source_dpi = source_dpi
+        self.contrast = contrast
+        self.binarize = binarize
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self.batch_size = batch_size
+        self.pages = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        """Identifies the settings, so OCR results cached with other settings are not reused"""
+        return (f'preprocess:dpi={self.target_dpi}/{self.source_dpi},contrast={self.contrast},'
+                f'binarize={self.binarize},p={self.low_percentile}-{self.high_percentile}')
+
+    @property
+    def scale(self):
+        """Factor the page images are resized by before OCR"""
+        if self.target_dpi and self.target_dpi < self.source_dpi:
+            return self.target_dpi / self.source_dpi
+        return 1.0
+
+    def _grayscale(self, image):
+        gray = image.convert('L')
+        scale = self.scale
+        if scale < 1.0:
+            size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+            gray = gray.resize(size, Image.BOX)
+        return gray
+
+    def _lookup_tables(self, histograms):
+        """(N, 256) uint8 tables mapping each page's grey levels to its OCR image"""
+        count = histograms.shape[0]
+        levels = np.arange(256)
+        tables = np.tile(levels, (count, 1))
+
+        if self.contrast:
+            cdf = np.cumsum(histograms, axis=1) / np.maximum(histograms.sum(axis=1, keepdims=True), 1)
+            low = np.argmax(cdf >= self.low_percentile / 100.0, axis=1)[:, None]
+            high = np.argmax(cdf >= self.high_percentile / 100.0, axis=1)[:, None]
+            tables = np.clip((levels - low) * 255.0 / np.maximum(high - low, 1), 0, 255).astype(np.int64)
+
+        if self.binarize:
+            # Histogram of the stretched pages, then Otsu on that
+            offsets = (np.arange(count) * 256)[:, None]
+            stretched = np.bincount((tables + offsets).ravel(), weights=histograms.ravel(),
+                                    minlength=256 * count).reshape(count, 256)
+            thresholds = otsu_thresholds(stretched)[:, None]
+            light = tables > thresholds
+            # Keep the background white: if most pixels fall below the threshold the page is light-on-dark
+            light_share = (stretched * (levels > thresholds)).sum(axis=1) / np.maximum(stretched.sum(axis=1), 1)
+            light ^= (light_share < 0.5)[:, None]
+            tables = np.where(light, 255, 0)
+
+        return tables.astype(np.uint8)
+
+    def process_batch(self, images):
+        """
+        Preprocess several pages
+
+        Args:
+            images (list): PIL images
+
+        Returns:
+            list: OCR-only PIL images (mode 'L'), in the same order
+        """
+        started = time.perf_counter()
+        grays = [self._grayscale(image) for image in images]
+        if not grays:
+            return []
+
+        histograms = np.array([gray.histogram() for gray in grays], dtype=np.int64)
+        tables = self._lookup_tables(histograms)
+        results = [gray.point(table.tolist()) for gray, table in zip(grays, tables)]
+
+        with self._lock:
+            self.pages += len(images)
+            self.seconds += time.perf_counter() - started
+        return results
+
+    def process(self, image):
+        """Preprocess one page"""
+        return self.process_batch([image])[0]
+
+    def summary(self):
+        """One-line timing summary, e.g. for the end of a run"""
+        if not self.pages:
+            return "OCR preprocessing: no pages"
+        return (f"OCR preprocessing: {self.pages} pages, "
+                f"{1000 * self.seconds / self.pages:.0f} ms/page")
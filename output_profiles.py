@@ -0,0 +1,234 @@
+"""
+Output size profiles for finished PDFs.
+
+A profile recompresses the images embedded in a PDF after it has been built, so
+OCR always runs on the full-quality page images and only the stored copy gets
+smaller:
+
+- archive: images are kept exactly as they are; the PDF structure is optimized losslessly
+- balanced: images above 200 DPI are downscaled, re-encoded as JPEG quality 85,
+  and stored in grayscale when they have no colour
+- compact: the same at 150 DPI and JPEG quality 65
+
+Images are recompressed on a thread pool (Pillow releases the GIL while it
+decodes, resizes and encodes), and an image is only replaced if the new version
+is smaller. Run this module on a PDF to compare all profiles:
+
+    python output_profiles.py document.pdf
+"""
+
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+OUTPUT_PROFILES = {
+    'archive': {'target_dpi': None, 'jpeg_quality': None, 'grayscale': False},
+    'balanced': {'target_dpi': 200, 'jpeg_quality': 85, 'grayscale': True},
+    'compact': {'target_dpi': 150, 'jpeg_quality': 65, 'grayscale': True},
+}
+
+GRAYSCALE_TOLERANCE = 6  # Largest channel difference (out of 255) still treated as grey
+RECOMPRESSIBLE_COLOR_SPACES = ('/DeviceRGB', '/DeviceGray')
+
+
+def is_grayscale(image, tolerance=GRAYSCALE_TOLERANCE):
+    """True if an RGB image has (almost) no colour, checked on a reduced copy"""
+    if image.mode == 'L':
+        return True
+    sample = np.asarray(image.reduce(4) if min(image.size) >= 64 else image, dtype=np.int16)
+    return int((sample.max(axis=2) - sample.min(axis=2)).max()) <= tolerance
+
+
+def transcode_image(image, dpi, target_dpi=None, jpeg_quality=85, grayscale=True):
+    """
+    Re-encode one image as an optimized JPEG
+
+    Args:
+        image (PIL.Image.Image): Decoded RGB or grayscale image
+        dpi (float): Resolution the image is displayed at in the PDF
+        target_dpi (int): Downscale to this resolution if the image is finer (None keeps the size)
+        jpeg_quality (int): JPEG quality 1-95
+        grayscale (bool): Store images without colour as grayscale
+
+    Returns:
+        tuple: (JPEG bytes, PIL mode, (width, height)) of the result
+    """
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    if grayscale and image.mode == 'RGB' and is_grayscale(image):
+        image = image.convert('L')
+    if target_dpi and dpi > target_dpi * 1.05:
+        scale = target_dpi / dpi
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=jpeg_quality, optimize=True)
+    return output.getvalue(), image.mode, image.size
+
+
+def _page_images(container, seen):
+    """Yield image XObjects used by a page or form XObject, once each"""
+    resources = container.get('/Resources')
+    xobjects = resources.get('/XObject') if resources is not None else None
+    if xobjects is None:
+        return
+    for _, xobject in xobjects.items():
+        if xobject.objgen in seen:
+            continue
+        seen.add(xobject.objgen)
+        if xobject.get('/Subtype') == '/Image':
+            yield xobject
+        elif xobject.get('/Subtype') == '/Form':
+            yield from _page_images(xobject, seen)
+
+
+def _image_jobs(pdf):
+    """(image XObject, display DPI) for every recompressible image in the PDF"""
+    seen = set()
+    jobs = []
+    for page in pdf.pages:
+        # Slides are full-page images, so the page width gives the display size
+        page_width_inches = float(page.mediabox[2] - page.mediabox[0]) / 72
+        for image in _page_images(page.obj, seen):
+            if '/SMask' in image or '/Mask' in image or image.get('/ImageMask', False):
+                continue
+            if str(image.get('/ColorSpace')) not in RECOMPRESSIBLE_COLOR_SPACES:
+                continue
+            if int(image.get('/BitsPerComponent', 8)) != 8:
+                continue
+            dpi = int(image.Width) / page_width_inches if page_width_inches > 0 else 0
+            jobs.append((image, dpi))
+    return jobs
+
+
+def _image_payload(image):
+    """
+    Pull what a worker thread needs to decode an image XObject
+
+    pikepdf objects are only touched on the calling thread; workers get plain bytes.
+    """
+    import pikepdf
+    filters = image.get('/Filter')
+    filters = [filters] if isinstance(filters, pikepdf.Name) else list(filters or [])
+    if filters == [pikepdf.Name.DCTDecode]:
+        return image.read_raw_bytes(), None, None  # The stream is a JPEG file
+    mode = 'L' if image.ColorSpace == pikepdf.Name.DeviceGray else 'RGB'
+    return image.read_bytes(pikepdf.StreamDecodeLevel.all), mode, (int(image.Width), int(image.Height))
+
+
+def _transcode_payload(payload, dpi, settings):
+    data, mode, size = payload
+    if mode is None:
+        image = Image.open(io.BytesIO(data))
+    else:
+        image = Image.frombytes(mode, size, data)
+    return transcode_image(image, dpi, settings['target_dpi'], settings['jpeg_quality'], settings['grayscale'])
+
+
+def apply_output_profile(input_pdf, output_pdf=None, profile='balanced', workers=None):
+    """
+    Write a copy of a PDF with its images recompressed for a profile
+
+    Args:
+        input_pdf (str): PDF to optimize
+        output_pdf (str): Where to write the result (default: replace input_pdf)
+        profile (str): 'archive', 'balanced' or 'compact'
+        workers (int): Images recompressed in parallel (default: one per CPU core)
+
+    Returns:
+        dict: profile, input_bytes, output_bytes, images (recompressed) and seconds;
+            None if pikepdf is not installed
+    """
+    try:
+        import pikepdf
+    except ImportError:
+        print("❌ pikepdf not available - install with: pip install pikepdf")
+        return None
+
+    settings = OUTPUT_PROFILES[profile]
+    output_pdf = output_pdf or input_pdf
+    started = time.time()
+    input_bytes = os.path.getsize(input_pdf)
+    recompressed = 0
+
+    with pikepdf.open(input_pdf) as pdf:
+        if settings['jpeg_quality'] is not None:
+            jobs = _image_jobs(pdf)
+            workers = workers or os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # A few images per worker at a time, so decoded pages don't pile up in memory
+                for start in range(0, len(jobs), 2 * workers):
+                    chunk = []
+                    for image, dpi in jobs[start:start + 2 * workers]:
+                        try:
+                            payload = _image_payload(image)
+                        except pikepdf.PdfError:
+                            continue  # A filter pikepdf can't decode - leave the image alone
+                        chunk.append((image, executor.submit(_transcode_payload, payload, dpi, settings)))
+                    for image, future in chunk:
+                        data, mode, size = future.result()
+                        if len(data) >= len(image.read_raw_bytes()):
+                            continue  # Never make an image bigger
+                        image.write(data, filter=pikepdf.Name.DCTDecode)
+                        image.Width, image.Height = size
+                        image.ColorSpace = pikepdf.Name.DeviceGray if mode == 'L' else pikepdf.Name.DeviceRGB
+                        image.BitsPerComponent = 8
+                        for key in ('/DecodeParms', '/Decode'):
+                            if key in image:
+                                del image[key]
+                        recompressed += 1
+
+        # Lossless part: compress all streams and pack objects into object streams
+        temp_pdf = f'{output_pdf}.tmp'
+        pdf.save(temp_pdf, compress_streams=True, recompress_flate=True,
+                 object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    os.replace(temp_pdf, output_pdf)
+
+    return {
+        'profile': profile,
+        'input_bytes': input_bytes,
+        'output_bytes': os.path.getsize(output_pdf),
+        'images': recompressed,
+        'seconds': time.time() - started,
+    }
+
+
+def describe_result(result):
+    """One-line size/time summary of apply_output_profile's result"""
+    saved = 1 - result['output_bytes'] / max(result['input_bytes'], 1)
+    return (f"{result['profile']}: {result['input_bytes'] / 1e6:.1f} MB -> {result['output_bytes'] / 1e6:.1f} MB "
+            f"({saved:.0%} smaller, {result['images']} images recompressed) in {result['seconds']:.1f}s")
+
+
+def compare_output_profiles(input_pdf, profiles=None, workers=None):
+    """
+    Write input_pdf once per profile (as name_<profile>.pdf) and print the trade-offs
+
+    Returns:
+        list: apply_output_profile results
+    """
+    results = []
+    base = input_pdf[:-4] if input_pdf.lower().endswith('.pdf') else input_pdf
+    for profile in profiles or OUTPUT_PROFILES:
+        result = apply_output_profile(input_pdf, f'{base}_{profile}.pdf', profile, workers)
+        if result is None:
+            break
+        print(f"📦 {describe_result(result)}")
+        results.append(result)
+    return results
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python output_profiles.py document.pdf [profile ...]")
+        return
+    compare_output_profiles(sys.argv[1], sys.argv[2:] or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Registry of PDF engines, each imported only when it is selected.
+
+An engine is a function that builds a PDF from a directory of page images (or
+in-memory pages), named by where it lives rather than imported up front:
+
+    create_pdf = get_pdf_engine('tesseract')
+    create_pdf(image_dir, output_pdf, language='eng')
+
+So a download-only or image-only run never loads pytesseract, PyPDF2,
+ocrmypdf or NumPy, and starting a script costs little more than starting
+Python. Engines kept elsewhere can be added with register_pdf_engine:
+
+    register_pdf_engine('my-engine', 'my_module:create_pdf')
+
+OCR backends ('subprocess', 'tesserocr') are selected the same way, by name,
+with compile_to_pdf.use_ocr_backend.
+"""
+
+import importlib
+
+# Engine name -> 'module:function' (imported on first use) or the function itself
+PDF_ENGINES = {
+    'image-only': 'compile_to_pdf:create_pdf_without_ocr',
+    'tesseract': 'compile_to_pdf:create_pdf_with_tesseract_default',
+    'pipelined': 'compile_to_pdf:create_pdf_pipelined',
+    'ocrmypdf': 'compile_to_pdf:create_pdf_with_ocrmypdf',
+    'tesseract-fallback': 'compile_to_pdf:create_pdf_with_tesseract_fallback',
+}
+
+
+def register_pdf_engine(name, engine):
+    """
+    Add or replace a PDF engine
+
+    Args:
+        name (str): Name to select it by
+        engine: 'module:function' string, imported when the engine is first used,
+            or the function itself
+    """
+    PDF_ENGINES[name] = engine
+
+
+def get_pdf_engine(name):
+    """
+    Import and return a PDF engine
+
+    Returns:
+        The engine function
+
+    Raises:
+        ValueError: If no engine is registered under name
+    """
+    try:
+        engine = PDF_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown PDF engine '{name}' (available: {', '.join(PDF_ENGINES)})") from None
+    if isinstance(engine, str):
+        module_name, _, function_name = engine.partition(':')
+        engine = PDF_ENGINES[name] = getattr(importlib.import_module(module_name), function_name)
+    return engine
@@ -0,0 +1,148 @@
+"""
+Adaptive token-bucket rate limiter shared by DocSend downloaders
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Status codes that mean the server wants us to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header value
+    
+    Args:
+        value (str): Either a number of seconds or an HTTP date
+        
+    Returns:
+        float: Seconds to wait, or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to how the server responds.
+    
+    The rate is raised once per window of healthy responses: doubled until the
+    server first pushes back (slow start), then by increase_step (additive
+    increase). A 429/503 cuts it (multiplicative decrease) and, with a Retry-After
+    header, pauses all callers until the server says it is ready again. Callers
+    get their turn in the order they asked. One instance is safe to share across
+    threads and documents.
+    """
+
+    def __init__(self, initial_rate=4.0, min_rate=0.5, max_rate=20.0, burst=4,
+                 increase_step=1.0, decrease_factor=0.5, window=1.0):
+        """
+        Args:
+            initial_rate (float): Starting requests per second
+            min_rate (float): Lower bound the rate never drops below
+            max_rate (float): Upper bound the rate never rises above
+            burst (int): Bucket capacity - requests allowed back to back
+            increase_step (float): Requests/second added per healthy window once throttled
+            decrease_factor (float): Multiplier applied to the rate when throttled
+            window (float): Seconds of healthy responses between two rate increases
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.burst = max(1, burst)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.window = window
+        
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._window_start = self._last_refill
+        self._slow_start = True
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._turn = threading.Condition(self._lock)
+        self._waiters = deque()  # One entry per acquire() call, in arrival order
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+
+    def acquire(self):
+        """Block until a request may be sent; callers are served first come, first served"""
+        me = object()
+        with self._turn:
+            self._waiters.append(me)
+            try:
+                while True:
+                    if self._waiters[0] is not me:
+                        self._turn.wait()
+                        continue
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self._blocked_until:
+                        wait = self._blocked_until - now
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    else:
+                        wait = (1 - self._tokens) / self.rate
+                    self._turn.wait(wait)
+            finally:
+                self._waiters.remove(me)
+                self._turn.notify_all()
+
+    def record_response(self, status_code, retry_after=None):
+        """
+        Adjust the rate from a server response
+        
+        Args:
+            status_code (int): HTTP status of the response
+            retry_after (str): Value of the Retry-After header, if any; only
+                honoured on a 429/503
+        """
+        with self._turn:
+            now = time.monotonic()
+            if status_code in THROTTLE_STATUS_CODES:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._tokens = 0.0
+                self._slow_start = False
+                self._window_start = now
+                delay = parse_retry_after(retry_after)
+                if delay:
+                    self._blocked_until = max(self._blocked_until, now + delay)
+                self._turn.notify_all()
+            elif status_code < 400 and now - self._window_start >= self.window:
+                if self._slow_start:
+                    self.rate = min(self.max_rate, self.rate * 2)
+                else:
+                    self.rate = min(self.max_rate, self.rate + self.increase_step)
+                self._window_start = now
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter():
+    """Return the process-wide rate limiter used by default by every downloader"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter()
+        return _shared_limiter
@@ -0,0 +1,31 @@
+"""
+Shared setup for the test suite: make the root-level modules and the
+benchmarks' mock DocSend server importable, and start a mock per test.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from mock_docsend import MockDocSendServer  # noqa: E402
+
+DOCUMENT_ID, VIEW_ID = 'mockdoc', 'mockview'
+
+
+@pytest.fixture
+def mock_docsend(request):
+    """
+    A running MockDocSendServer with small slides
+
+    Parametrize indirectly with a dict of MockDocSendServer arguments to change
+    the page count, latency or failure rates.
+    """
+    settings = {'pages': 8, 'image_size': (320, 180), 'retry_after': 0, 'seed': 1}
+    settings.update(getattr(request, 'param', {}))
+    with MockDocSendServer(**settings) as server:
+        yield server
@@ -0,0 +1,97 @@
+"""
+DocSendImageDownloader against the mock DocSend server: concurrent fetching,
+retries of transient failures, and resuming from the manifest.
+"""
+
+import os
+
+import pytest
+
+from conftest import DOCUMENT_ID, VIEW_ID
+from docsend_image_downloader import DocSendImageDownloader
+from download_manifest import load_manifest
+from rate_limiter import AdaptiveRateLimiter
+
+
+def make_downloader(server, max_workers=4, max_retries=3):
+    """A downloader pointed at the mock, with its own unthrottled limiter and short backoff"""
+    downloader = DocSendImageDownloader(max_workers=max_workers, max_retries=max_retries, backoff_base=0.001,
+                                        rate_limiter=AdaptiveRateLimiter(initial_rate=1000, max_rate=1000))
+    downloader.base_url = server.base_url
+    return downloader
+
+
+def page_file(output_dir, page):
+    return os.path.join(output_dir, f'page_{page:03d}.jpg')
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('mock_docsend', [{'pages': 12, 'latency': 0.01, 'jitter': 0.02}], indirect=True)
+def test_concurrent_download_fetches_every_page(mock_docsend, tmp_path):
+    output_dir = str(tmp_path)
+    downloader = make_downloader(mock_docsend)
+
+    assert downloader.download_document_images(DOCUMENT_ID, VIEW_ID, output_dir=output_dir) == 12
+    assert downloader.failed_pages == {}
+    for page in range(1, 13):
+        assert read_bytes(page_file(output_dir, page)) == mock_docsend.image_bytes(page)
+    assert sorted(int(page) for page in load_manifest(output_dir)['pages']) == list(range(1, 13))
+
+
+@pytest.mark.parametrize('mock_docsend', [{'pages': 10, 'jitter': 0.03}], indirect=True)
+def test_iter_page_images_yields_in_page_order(mock_docsend):
+    downloader = make_downloader(mock_docsend)
+
+    pages = list(downloader.iter_page_images(DOCUMENT_ID, VIEW_ID))
+
+    assert [page for page, _ in pages] == list(range(1, 11))
+    assert all(data == mock_docsend.image_bytes(page) for page, data in pages)
+
+
+@pytest.mark.parametrize('mock_docsend', [{'error_rate': 0.15, 'throttle_rate': 0.15, 'seed': 7}], indirect=True)
+def test_transient_failures_are_retried(mock_docsend, tmp_path):
+    downloader = make_downloader(mock_docsend, max_retries=8)
+
+    assert downloader.download_document_images(DOCUMENT_ID, VIEW_ID, output_dir=str(tmp_path), end_page=8) == 8
+    assert downloader.failed_pages == {}
+    stats = mock_docsend.stats()
+    assert stats.get('status_500', 0) + stats.get('status_429', 0) > 0
+
+
+@pytest.mark.parametrize('mock_docsend', [{'error_rate': 0.3, 'seed': 3}], indirect=True)
+def test_retried_requests_keep_their_connection(mock_docsend, tmp_path):
+    downloader = make_downloader(mock_docsend, max_workers=1, max_retries=8)
+
+    downloader.download_document_images(DOCUMENT_ID, VIEW_ID, output_dir=str(tmp_path), end_page=4)
+
+    assert mock_docsend.stats().get('status_500', 0) > 0
+    assert downloader.connection_stats()['connections'] == 1
+
+
+@pytest.mark.parametrize('mock_docsend', [{'error_rate': 1.0}], indirect=True)
+def test_pages_failing_every_retry_are_recorded(mock_docsend, tmp_path):
+    downloader = make_downloader(mock_docsend, max_retries=1)
+
+    assert downloader.download_document_images(DOCUMENT_ID, VIEW_ID, output_dir=str(tmp_path), end_page=3) == 0
+    assert sorted(downloader.failed_pages) == [1, 2, 3]
+    assert not os.path.exists(page_file(str(tmp_path), 1))
+
+
+@pytest.mark.parametrize('mock_docsend', [{'pages': 6}], indirect=True)
+def test_resume_keeps_verified_pages_and_refetches_corrupt_ones(mock_docsend, tmp_path):
+    output_dir = str(tmp_path)
+    downloader = make_downloader(mock_docsend)
+    assert downloader.download_document_images(DOCUMENT_ID, VIEW_ID, output_dir=output_dir, end_page=6) == 6
+
+    with open(page_file(output_dir, 3), 'r+b') as f:
+        f.write(b'corrupt')
+    mock_docsend.reset_stats()
+
+    assert downloader.download_document_images(DOCUMENT_ID, VIEW_ID, output_dir=output_dir, end_page=6) == 6
+    # Only page 3's page_data and image are requested again
+    assert mock_docsend.stats()['requests'] == 2
+    assert read_bytes(page_file(output_dir, 3)) == mock_docsend.image_bytes(3)
@@ -0,0 +1,129 @@
+"""
+compile_to_pdf._ocrmypdf_pages: retrying a failed OCRmyPDF run with minimal
+settings, then splitting it to isolate the pages that make it fail.
+
+OCRmyPDF itself is not needed: _run_ocrmypdf is replaced by a fake that fails
+whenever its range contains one of the given bad pages.
+"""
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+import compile_to_pdf
+
+
+class MissingDependencyError(Exception):
+    pass
+
+
+FAKE_OCRMYPDF = SimpleNamespace(exceptions=SimpleNamespace(MissingDependencyError=MissingDependencyError))
+FULL_OPTIONS = {'clean': True}
+MINIMAL_OPTIONS = {'clean': False}
+
+
+@pytest.fixture
+def fake_ocrmypdf(monkeypatch):
+    """
+    Patch the OCRmyPDF run and the per-page fallback
+
+    Returns a namespace: set `bad_pages` (sources that make a run fail) and
+    `error` (a callable giving the exception for a failing range); `runs` records
+    (sources, options) for every run and `fallbacks` the pages that fell back.
+    """
+    fake = SimpleNamespace(bad_pages=set(), runs=[], fallbacks=[],
+                           error=lambda sources: RuntimeError(f"bad pages in {sources}"))
+
+    def run(ocrmypdf, sources, options):
+        fake.runs.append((list(sources), options))
+        if fake.bad_pages.intersection(sources):
+            raise fake.error(sources)
+        return '+'.join(sources)
+
+    def fallback(source, i, error, language, ocr_cache, failed_pages):
+        fake.fallbacks.append(i)
+        failed_pages.append(i)
+        return [f'fallback:{source}']
+
+    monkeypatch.setattr(compile_to_pdf, '_run_ocrmypdf', run)
+    monkeypatch.setattr(compile_to_pdf, '_ocrmypdf_page_fallback', fallback)
+    return fake
+
+
+def ocr_all(sources, failed_pages):
+    return compile_to_pdf._ocrmypdf_pages(FAKE_OCRMYPDF, sources, 0, len(sources), FULL_OPTIONS, 'eng', None,
+                                          failed_pages, retry_options=MINIMAL_OPTIONS)
+
+
+def covered_pages(parts):
+    return [page.split(':')[-1] for part in parts for page in part.split('+')]
+
+
+def test_clean_run_is_not_retried(fake_ocrmypdf):
+    sources = [f'p{n}' for n in range(1, 6)]
+
+    assert ocr_all(sources, []) == ['+'.join(sources)]
+    assert len(fake_ocrmypdf.runs) == 1
+
+
+def test_minimal_settings_are_tried_before_splitting(fake_ocrmypdf, monkeypatch):
+    sources = [f'p{n}' for n in range(1, 5)]
+    failed_pages = []
+
+    def fail_with_full_settings(ocrmypdf, pages, options):
+        fake_ocrmypdf.runs.append((list(pages), options))
+        if options is FULL_OPTIONS:
+            raise RuntimeError("unpaper crashed")
+        return '+'.join(pages)
+
+    monkeypatch.setattr(compile_to_pdf, '_run_ocrmypdf', fail_with_full_settings)
+    assert ocr_all(sources, failed_pages) == ['+'.join(sources)]
+    assert [options for _, options in fake_ocrmypdf.runs] == [FULL_OPTIONS, MINIMAL_OPTIONS]
+    assert failed_pages == []
+
+
+@pytest.mark.parametrize('pages, bad', [(8, 'p5'), (7, 'p1'), (16, 'p16')])
+def test_one_bad_page_is_isolated(fake_ocrmypdf, pages, bad):
+    sources = [f'p{n}' for n in range(1, pages + 1)]
+    fake_ocrmypdf.bad_pages = {bad}
+    failed_pages = []
+
+    parts = ocr_all(sources, failed_pages)
+
+    assert covered_pages(parts) == sources
+    assert failed_pages == fake_ocrmypdf.fallbacks == [sources.index(bad) + 1]
+    # Full run, minimal retry of the whole range, then two runs per halving
+    assert fake_ocrmypdf.runs[1] == (sources, MINIMAL_OPTIONS)
+    assert len(fake_ocrmypdf.runs) <= 2 + 2 * math.ceil(math.log2(pages))
+
+
+def test_two_bad_pages_are_isolated(fake_ocrmypdf):
+    sources = [f'p{n}' for n in range(1, 9)]
+    fake_ocrmypdf.bad_pages = {'p2', 'p7'}
+    failed_pages = []
+
+    assert covered_pages(ocr_all(sources, failed_pages)) == sources
+    assert failed_pages == [2, 7]
+
+
+def test_same_failure_everywhere_stops_splitting(fake_ocrmypdf):
+    sources = [f'p{n}' for n in range(1, 9)]
+    fake_ocrmypdf.bad_pages = set(sources)
+    fake_ocrmypdf.error = lambda pages: RuntimeError("tesseract language data missing")
+    failed_pages = []
+
+    assert covered_pages(ocr_all(sources, failed_pages)) == sources
+    assert failed_pages == list(range(1, 9))
+    # Full run, minimal retry, one split into halves - then every page falls back
+    assert len(fake_ocrmypdf.runs) == 4
+
+
+def test_missing_dependency_with_minimal_settings_is_raised(fake_ocrmypdf):
+    sources = ['p1', 'p2']
+    fake_ocrmypdf.bad_pages = set(sources)
+    fake_ocrmypdf.error = lambda pages: MissingDependencyError("tesseract")
+
+    with pytest.raises(MissingDependencyError):
+        ocr_all(sources, [])
+    assert len(fake_ocrmypdf.runs) == 2
@@ -0,0 +1,166 @@
+"""
+Single-pass writer for searchable PDFs.
+
+Instead of asking Tesseract for a finished PDF per page and re-parsing it with
+PyPDF2, Tesseract is asked only for its word boxes (TSV output of
+image_to_data). Each page is then drawn once with reportlab: the original page
+image fills the page and the recognised words are laid over it as invisible
+text (text render mode 3), so the PDF is searchable and selectable but looks
+exactly like the slide.
+"""
+
+import io
+import os
+import threading
+from contextlib import contextmanager
+
+from PIL import Image
+from reportlab import rl_config
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+DEFAULT_DPI = 300
+TEXT_FONT = 'Helvetica'
+INVISIBLE_TEXT = 3  # PDF text render mode: neither fill nor stroke
+
+_rl_config_lock = threading.RLock()
+
+
+@contextmanager
+def binary_streams():
+    """
+    Switch off reportlab's ASCII85 stream encoding while a writer draws or saves
+
+    The ASCII85 filter is pure Python (it dominated page time for large JPEGs)
+    and makes every image a quarter bigger. reportlab only has a process-wide
+    setting for it (rl_config.useA85), read when images are added and when the
+    file is written, so it is changed for just those calls and then restored.
+    Writers in other threads wait for each other, so none of them restores the
+    setting while another is still writing.
+    """
+    with _rl_config_lock:
+        saved = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            yield
+        finally:
+            rl_config.useA85 = saved
+
+
+def parse_tsv_words(tsv):
+    """
+    Pull word boxes out of Tesseract's TSV output
+
+    Args:
+        tsv (str or bytes): Output of pytesseract.image_to_data
+
+    Returns:
+        list: (left, top, width, height, text, line) tuples, with the box in image
+            pixels and line a (block_num, par_num, line_num) key for the text line
+            the word is on (None if the TSV has no such columns)
+    """
+    if isinstance(tsv, (bytes, bytearray)):
+        tsv = tsv.decode('utf-8')
+    lines = tsv.splitlines()
+    if not lines:
+        return []
+
+    columns = lines[0].split('\t')
+    index = {name: i for i, name in enumerate(columns)}
+    line_columns = [index[name] for name in ('block_num', 'par_num', 'line_num') if name in index]
+    words = []
+    for line in lines[1:]:
+        fields = line.split('\t')
+        if len(fields) < len(columns) or fields[index['level']] != '5':
+            continue
+        text = fields[index['text']].strip()
+        if not text:
+            continue
+        left, top, width, height = (int(fields[index[name]]) for name in ('left', 'top', 'width', 'height'))
+        if width > 0 and height > 0:
+            line_key = tuple(fields[i] for i in line_columns) if len(line_columns) == 3 else None
+            words.append((left, top, width, height, text, line_key))
+    return words
+
+
+class TextLayerPDFWriter:
+    """Write page images plus invisible OCR text to one PDF in a single pass"""
+
+    def __init__(self, output_pdf, dpi=DEFAULT_DPI, font_name=TEXT_FONT):
+        """
+        Args:
+            output_pdf (str): Output PDF path (or a writable binary file object)
+            dpi (int): Resolution the page images are assumed to have
+            font_name (str): Font for the text layer. The built-in Helvetica covers
+                Latin scripts; register a TTF with reportlab for other scripts.
+        """
+        if isinstance(output_pdf, str):
+            os.makedirs(os.path.dirname(output_pdf) or '.', exist_ok=True)
+        self.output_pdf = output_pdf
+        self.scale = 72.0 / dpi
+        self.font_name = font_name
+        self.page_count = 0
+        self._canvas = None
+
+    def add_page(self, source, words=None):
+        """
+        Append one page
+
+        Args:
+            source: Page image as a file path or bytes
+            words (list): Word boxes from parse_tsv_words; None for an image-only page
+        """
+        image = source
+        if isinstance(source, (bytes, bytearray)):
+            image = io.BytesIO(source)
+        with Image.open(image) as img:
+            img_width, img_height = img.size
+        page_width = img_width * self.scale
+        page_height = img_height * self.scale
+
+        with binary_streams():
+            if self._canvas is None:
+                self._canvas = canvas.Canvas(self.output_pdf, pagesize=(page_width, page_height))
+            else:
+                self._canvas.showPage()
+                self._canvas.setPageSize((page_width, page_height))
+            c = self._canvas
+
+            if isinstance(source, (bytes, bytearray)):
+                source = ImageReader(io.BytesIO(source))
+            c.drawImage(source, 0, 0, width=page_width, height=page_height, mask='auto')
+
+        # One text object per Tesseract line, with a space after every word but the
+        # last, like Tesseract's own PDF renderer, so extracted text keeps its
+        # word and line breaks
+        for n, (left, top, width, height, word, line_key) in enumerate(words or ()):
+            if n == 0 or line_key != words[n - 1][5] or line_key is None:
+                text = c.beginText()
+                text.setTextRenderMode(INVISIBLE_TEXT)
+            font_size = height * self.scale
+            box_width = width * self.scale
+            # Word boxes include descenders, so sit the baseline a little above the bottom edge
+            text.setFont(self.font_name, font_size)
+            natural_width = c.stringWidth(word, self.font_name, font_size)
+            text.setHorizScale(100.0 * box_width / natural_width if natural_width else 100.0)
+            text.setTextOrigin(left * self.scale, page_height - (top + height * 0.8) * self.scale)
+            last_in_line = n + 1 == len(words) or line_key is None or words[n + 1][5] != line_key
+            text.textOut(word if last_in_line else word + ' ')
+            if last_in_line:
+                c.drawText(text)
+
+        self.page_count += 1
+
+    def save(self):
+        """
+        Finish the PDF
+
+        Returns:
+            bool: False if no pages were added (nothing is written)
+        """
+        if self._canvas is None:
+            return False
+        with binary_streams():
+            self._canvas.save()
+        self._canvas = None
+        return True
@@ -0,0 +1,236 @@
+"""
+HTTP transport setup for the shared downloader Session.
+
+Provides a tuned urllib3 connection pool, an optional HTTP/2 transport built on
+httpx (used only when httpx with h2 is installed), and connection reuse
+statistics for both.
+"""
+
+import importlib.util
+import threading
+from http.client import HTTPMessage
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+def supported_accept_encoding():
+    """Only advertise brotli when a decoder is installed, otherwise 'br' bodies arrive undecodable"""
+    if any(importlib.util.find_spec(module) for module in ('brotli', 'brotlicffi')):
+        return 'gzip, deflate, br'
+    return 'gzip, deflate'
+
+
+def http2_available():
+    """True if httpx and h2 are installed (checked without importing them)"""
+    return all(importlib.util.find_spec(module) for module in ('httpx', 'h2'))
+
+
+class _HTTPXRaw:
+    """File-like wrapper that lets requests consume an httpx response body"""
+
+    def __init__(self, response):
+        self._response = response
+        self._original_response = _CookieSource(response.headers.multi_items())
+        self._iterator = None
+        self._buffer = b''
+
+    def stream(self, chunk_size=65536, decode_content=True):
+        import httpx
+        try:
+            for chunk in self._response.iter_bytes(chunk_size):
+                yield chunk
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e)
+        finally:
+            self._response.close()
+
+    def read(self, amt=None, decode_content=True):
+        if self._iterator is None:
+            self._iterator = self.stream()
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+
+class _CookieSource:
+    """Expose response headers the way requests' cookie extraction expects from http.client"""
+
+    def __init__(self, header_items):
+        self.msg = HTTPMessage()
+        for name, value in header_items:
+            self.msg[name] = value
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that counts requests and the sockets actually opened.
+    
+    urllib3's own pool counters track connection objects, which silently
+    reconnect when the server drops them, so they overstate reuse.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.num_requests = 0
+        self.num_connections = 0
+        self._lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _count_connection(self):
+        with self._lock:
+            self.num_connections += 1
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        adapter = self
+
+        def counting(connection_cls):
+            class CountingConnection(connection_cls):
+                def connect(self):
+                    super().connect()
+                    adapter._count_connection()
+            return CountingConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('CountingHTTPConnectionPool', (HTTPConnectionPool,),
+                         {'ConnectionCls': counting(HTTPConnection)}),
+            'https': type('CountingHTTPSConnectionPool', (HTTPSConnectionPool,),
+                          {'ConnectionCls': counting(HTTPSConnection)}),
+        }
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.num_requests += 1
+        return super().send(request, **kwargs)
+
+
+class HTTPXAdapter(BaseAdapter):
+    """
+    requests transport adapter backed by an httpx.Client with HTTP/2 enabled.
+    
+    Multiplexes concurrent requests to the same host over one connection, so a
+    pool of worker threads does not need one socket per thread.
+    """
+
+    def __init__(self, max_connections=DEFAULT_POOL_MAXSIZE, keepalive_expiry=30.0, http2=True):
+        import httpx
+        super().__init__()
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections,
+                              keepalive_expiry=keepalive_expiry)
+        self.client = httpx.Client(http2=http2, limits=limits, follow_redirects=False)
+        self.num_requests = 0
+        self._streams = set()
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        import httpx
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        httpx_request = self.client.build_request(
+            request.method, request.url, headers=dict(request.headers),
+            content=request.body, timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT)
+        try:
+            httpx_response = self.client.send(httpx_request, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+        
+        with self._lock:
+            self.num_requests += 1
+            network_stream = httpx_response.extensions.get('network_stream')
+            if network_stream is not None:
+                self._streams.add(id(network_stream))
+        return self.build_response(request, httpx_response)
+
+    def build_response(self, request, httpx_response):
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        response.headers = CaseInsensitiveDict(httpx_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _HTTPXRaw(httpx_response)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    @property
+    def num_connections(self):
+        return len(self._streams)
+
+    def close(self):
+        self.client.close()
+
+
+def mount_transport(session, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                    pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, http2=False):
+    """
+    Mount a tuned transport adapter on a session for both http and https
+    
+    Args:
+        session (requests.Session): Session to configure
+        pool_connections (int): Number of per-host pools kept
+        pool_maxsize (int): Connections kept open per host
+        pool_block (bool): Wait for a free connection instead of opening a throwaway one
+        http2 (bool): Use the httpx HTTP/2 transport when available
+        
+    Returns:
+        BaseAdapter: The mounted adapter
+    """
+    if http2 and not http2_available():
+        print("⚠️  HTTP/2 requested but httpx[http2] is not installed - using HTTP/1.1")
+        http2 = False
+    
+    if http2:
+        adapter = HTTPXAdapter(max_connections=pool_maxsize)
+    else:
+        # Retries are handled by the downloader so they go through the rate limiter
+        adapter = PooledHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                    pool_block=pool_block, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
+
+
+def connection_stats(adapter, since=None):
+    """
+    Report how well connections are being reused
+    
+    Args:
+        since (dict): An earlier result for the same adapter; counts are then only
+            those since it was taken
+    
+    Returns:
+        dict: requests sent, connections opened and requests served on a reused connection
+    """
+    requests_sent = adapter.num_requests - (since['requests'] if since else 0)
+    connections = adapter.num_connections - (since['connections'] if since else 0)
+    return {
+        'requests': requests_sent,
+        'connections': connections,
+        'reused': max(0, requests_sent - connections),
+    }